@@ -1,5 +1,6 @@
-import xmlrpc.client
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from odoo_client import OdooRpcError, get_client, load_json
 
 def check_odoo_models():
     """
@@ -13,8 +14,7 @@ def check_odoo_models():
     """)
     
     # Load config
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    config = load_json('config.json')
     
     url = config['odoo_url'].rstrip('/')
     db = config['odoo_db']
@@ -23,42 +23,66 @@ def check_odoo_models():
     
     print(f"🔌 Connecting to {url}...")
     
-    # Authenticate
-    common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
-    uid = common.authenticate(db, username, password, {})
-    
-    if not uid:
+    # Authenticate (reuses the client if this process already logged in)
+    try:
+        uid, models = get_client(url, db, username, password)
+    except OdooRpcError:
         print("❌ Authentication failed!")
         return
     
     print(f"✅ Authenticated as user ID: {uid}\n")
     
-    models = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object')
-    
-    # Search for Field Service related models
-    print("🔍 Searching for Field Service models...\n")
+    # The client keeps one connection per thread, so it can be shared by
+    # the worker threads below
+    def execute(model, method, args, kwargs):
+        return models.execute_kw(db, uid, password, model, method, args, kwargs)
     
     field_service_keywords = [
         'fsm', 'field', 'service', 'worksheet', 
         'project.task', 'maintenance', 'helpdesk'
     ]
     
-    found_models = {}
-    
-    for keyword in field_service_keywords:
-        try:
-            model_ids = models.execute_kw(
-                db, uid, password,
-                'ir.model', 'search_read',
-                [[['model', 'ilike', keyword]]],
-                {'fields': ['model', 'name']}
-            )
-            
-            if model_ids:
-                for model in model_ids:
-                    found_models[model['model']] = model['name']
-        except:
-            pass
+    # One OR-domain (Odoo prefix notation) matching any of the keywords
+    keyword_domain = ['|'] * (len(field_service_keywords) - 1) + [
+        ['model', 'ilike', keyword] for keyword in field_service_keywords
+    ]
+    
+    # All diagnostic queries are independent: run them concurrently
+    probes = [
+        ('models', 'ir.model', 'search_read',
+         [keyword_domain],
+         {'fields': ['model', 'name']}),
+        ('project_task', 'ir.model', 'search_read',
+         [[['model', '=', 'project.task']]],
+         {'fields': ['model', 'name']}),
+        ('project_task_fields', 'ir.model.fields', 'search_read',
+         [[['model', '=', 'project.task'], ['name', 'ilike', 'worksheet']]],
+         {'fields': ['name', 'field_description'], 'limit': 10}),
+        ('modules', 'ir.module.module', 'search_read',
+         [[['name', 'ilike', 'field'], ['state', '=', 'installed']]],
+         {'fields': ['name', 'shortdesc']}),
+    ]
+    
+    print("🔍 Searching for Field Service models...\n")
+    
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+        futures = {
+            executor.submit(execute, *probe[1:]): probe[0]
+            for probe in probes
+        }
+        for future in as_completed(futures):
+            label = futures[future]
+            try:
+                results[label] = future.result()
+            except Exception as e:
+                errors[label] = e
+    
+    # Print the results in a fixed order once everything is collected
+    found_models = {
+        model['model']: model['name'] for model in results.get('models') or []
+    }
     
     if found_models:
         print("✅ Found the following models:")
@@ -72,54 +96,33 @@ def check_odoo_models():
     
     # Check for project.task specifically
     print("\n🔍 Checking project.task model...")
-    try:
-        project_task = models.execute_kw(
-            db, uid, password,
-            'ir.model', 'search_read',
-            [[['model', '=', 'project.task']]],
-            {'fields': ['model', 'name']}
-        )
+    if 'project_task' in errors:
+        print(f"❌ Error checking project.task: {errors['project_task']}")
+    elif results['project_task']:
+        print("✅ project.task model EXISTS")
+        print("   You can use 'project.task' as base_model")
         
-        if project_task:
-            print("✅ project.task model EXISTS")
-            print("   You can use 'project.task' as base_model")
-            
-            # Check fields on project.task
-            print("\n🔍 Checking existing fields on project.task...")
-            fields = models.execute_kw(
-                db, uid, password,
-                'ir.model.fields', 'search_read',
-                [[['model', '=', 'project.task'], ['name', 'ilike', 'worksheet']]],
-                {'fields': ['name', 'field_description'], 'limit': 10}
-            )
-            
-            if fields:
-                print("   Found worksheet-related fields:")
-                for field in fields:
-                    print(f"     • {field['name']}: {field['field_description']}")
-        else:
-            print("❌ project.task model NOT found (unusual)")
-    except Exception as e:
-        print(f"❌ Error checking project.task: {e}")
+        # Check fields on project.task
+        print("\n🔍 Checking existing fields on project.task...")
+        if 'project_task_fields' in errors:
+            print(f"❌ Error checking project.task: {errors['project_task_fields']}")
+        elif results['project_task_fields']:
+            print("   Found worksheet-related fields:")
+            for field in results['project_task_fields']:
+                print(f"     • {field['name']}: {field['field_description']}")
+    else:
+        print("❌ project.task model NOT found (unusual)")
     
     # Check installed modules
     print("\n🔍 Checking installed Field Service modules...")
-    try:
-        modules = models.execute_kw(
-            db, uid, password,
-            'ir.module.module', 'search_read',
-            [[['name', 'ilike', 'field'], ['state', '=', 'installed']]],
-            {'fields': ['name', 'shortdesc']}
-        )
-        
-        if modules:
-            print("✅ Installed Field Service modules:")
-            for mod in modules:
-                print(f"   • {mod['name']:<30} → {mod['shortdesc']}")
-        else:
-            print("❌ No Field Service modules found!")
-    except Exception as e:
-        print(f"❌ Error checking modules: {e}")
+    if 'modules' in errors:
+        print(f"❌ Error checking modules: {errors['modules']}")
+    elif results['modules']:
+        print("✅ Installed Field Service modules:")
+        for mod in results['modules']:
+            print(f"   • {mod['name']:<30} → {mod['shortdesc']}")
+    else:
+        print("❌ No Field Service modules found!")
     
     # Recommendations
     print("\n" + "=" * 70)
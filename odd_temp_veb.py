@@ -1,317 +1,521 @@
-import xmlrpc.client
+import asyncio
+import copy
+import functools
+import hashlib
 import json
 import sys
 import os
+import re
+import xml.etree.ElementTree as ET
+from types import MappingProxyType
 from typing import Dict, List, Any
 
+from odoo_client import JsonFileCache, get_client, load_json
+
+# Template field types and the ir.model.fields ttype they map to
+_FIELD_TYPE_MAP = MappingProxyType({
+    'char': 'char',
+    'text': 'text',
+    'integer': 'integer',
+    'float': 'float',
+    'date': 'date',
+    'datetime': 'datetime',
+    'boolean': 'boolean',
+    'selection': 'selection',
+})
+
+# Values shared by every custom field the designer creates
+_BASE_FIELD_VALS = MappingProxyType({'state': 'manual'})
+
+
+# Odoo custom field names: "x_" prefix, lowercase identifier, at most 63 characters
+_XNAME_RE = re.compile(r'^x_[a-z0-9_]{1,61}$')
+
+
+def _field_config_error(field_config: Dict[str, Any]):
+    """Return why a template field would be rejected by Odoo, or None if it is valid."""
+    if not isinstance(field_config, dict):
+        return "field definition must be a JSON object"
+    name = field_config.get('name')
+    if not isinstance(name, str) or not _XNAME_RE.match(name):
+        return "name must start with 'x_' and contain only lowercase letters, digits and '_'"
+    if not field_config.get('label'):
+        return "missing label"
+    selection = field_config.get('selection')
+    if field_config.get('field_type') == 'selection' and selection is not None:
+        if not isinstance(selection, list) or not all(
+                isinstance(item, (list, tuple)) and len(item) == 2 for item in selection):
+            return "selection must be a list of [value, label] pairs"
+    return None
+
+
+def _add_fields(parent: ET.Element, names, **attrs) -> None:
+    """Append one <field> element per name to a view node."""
+    for name in names:
+        ET.SubElement(parent, 'field', name=name, **attrs)
+
+
+def _build_ensayo_proto() -> ET.Element:
+    """Build the groups of one Ensayo block, with `{i}` standing for the run number."""
+    block = ET.Element('ensayo')
+    group = ET.SubElement(block, 'group', col='4')
+    _add_fields(group, ('x_test_{i}_imbalance',))
+    ET.SubElement(group, 'newline')
+    for speed in (50, 75, 100):
+        _add_fields(group, (f'x_test_{{i}}_speed_{speed}', f'x_test_{{i}}_vibration_{speed}'))
+    group = ET.SubElement(block, 'group')
+    ET.SubElement(group, 'field', name='x_test_{i}_comments', widget='text',
+                  nolabel='1', placeholder='Comentarios Ensayo {i}')
+    return block
+
+
+# Built once at import, copied for every Ensayo of the form
+_ENSAYO_PROTO = _build_ensayo_proto()
+
+
+@functools.lru_cache(maxsize=8)
+def _build_vibracion_xml(template_name: str) -> str:
+    """Build the Vibration test form arch for a template name."""
+    form = ET.Element('form', string=template_name)
+    sheet = ET.SubElement(form, 'sheet')
+    
+    title = ET.SubElement(sheet, 'div', {'class': 'oe_title'})
+    ET.SubElement(title, 'h1').text = 'Test de vibración'
+    
+    group = ET.SubElement(sheet, 'group', string='Información del Equipo', col='2')
+    _add_fields(group, ('x_assistance_code', 'x_client', 'x_model',
+                        'x_project', 'x_serial_number'))
+    
+    ET.SubElement(sheet, 'separator', string='1. Test de vibración')
+    for label, name in (('1.1. Objetivo', 'x_test_objective'),
+                        ('1.2. Procedimiento', 'x_test_procedure'),
+                        ('1.3. Método', 'x_test_method'),
+                        ('1.4. Criterio de aceptación', 'x_acceptance_criteria')):
+        group = ET.SubElement(sheet, 'group', string=label)
+        ET.SubElement(group, 'field', name=name, widget='text', readonly='1')
+    
+    ET.SubElement(sheet, 'separator', string='1.5. Instrumento de medición')
+    group = ET.SubElement(sheet, 'group', col='4')
+    _add_fields(group, ('x_instrument_brand_model', 'x_instrument_serial',
+                        'x_calibration_certificate', 'x_calibration_date'))
+    
+    ET.SubElement(sheet, 'separator', string='1.6. Datos de la prueba - Reglajes')
+    group = ET.SubElement(sheet, 'group', col='4')
+    _add_fields(group, ('x_limit_1', 'x_limit_2', 'x_max_speed', 'x_test_weights'))
+    
+    # Ensayo 1, 2 and 3 are copies of the same block
+    for i in range(1, 4):
+        ET.SubElement(sheet, 'separator', string=f'Ensayo {i}')
+        block = copy.deepcopy(_ENSAYO_PROTO)
+        for field in block.iter('field'):
+            for attr in ('name', 'placeholder'):
+                if attr in field.attrib:
+                    field.set(attr, field.get(attr).replace('{i}', str(i)))
+        sheet.extend(block)
+    
+    ET.SubElement(sheet, 'separator', string='1.7. Resultados test')
+    group = ET.SubElement(sheet, 'group')
+    ET.SubElement(group, 'field', name='x_test_comments', widget='text',
+                  placeholder='Comentarios generales')
+    ET.SubElement(group, 'field', name='x_result_status', widget='radio')
+    
+    ET.SubElement(sheet, 'separator')
+    group = ET.SubElement(sheet, 'group', col='4')
+    _add_fields(group, ('x_performed_by', 'x_department', 'x_test_date', 'x_signature'))
+    
+    return ET.tostring(form, encoding='unicode')
+
+
+def _arch_digest(arch: str) -> bytes:
+    """Hash a view arch, ignoring serialization details and indentation."""
+    try:
+        normalized = ET.canonicalize(arch, strip_text=True)
+    except ET.ParseError:
+        normalized = re.sub(r'>\s+<', '><', re.sub(r'\s+', ' ', arch)).strip()
+    return hashlib.blake2b(normalized.encode('utf-8')).digest()
+
+
+class MetadataCache(JsonFileCache):
+    """
+    LRU cache of Odoo metadata persisted between runs
+    Entries are keyed by server and database and expire after `ttl` seconds
+    """
+    
+    def __init__(self, path: str, url: str, db: str, maxsize: int = 128, ttl: float = 3600):
+        super().__init__(path, ttl=ttl, maxsize=maxsize)
+        self.prefix = f"{url}|{db}"
+    
+    def _get(self, kind: str, name: str):
+        return self.get(f"{self.prefix}|{kind}|{name}")
+    
+    def _set(self, kind: str, name: str, data):
+        self.set(f"{self.prefix}|{kind}|{name}", data)
+    
+    def _drop(self, kind: str, name: str):
+        self.pop(f"{self.prefix}|{kind}|{name}")
+    
+    def forget(self, template_name: str, model: str):
+        """Drop the entries of a template and its model, e.g. after a step using them failed."""
+        self._drop('template', template_name)
+        self._drop('model_id', model)
+        self._drop('fields', model)
+    
+    def get_fields(self, model: str):
+        """Return the cached field names of a model, or None."""
+        names = self._get('fields', model)
+        return set(names) if names is not None else None
+    
+    def set_fields(self, model: str, names: set):
+        self._set('fields', model, sorted(names))
+    
+    def get_model_id(self, model: str):
+        """Return the cached ir.model id of a model, or None."""
+        return self._get('model_id', model)
+    
+    def set_model_id(self, model: str, model_id: int):
+        self._set('model_id', model, model_id)
+    
+    def get_template(self, template_name: str):
+        """Return the cached (template_id, worksheet_model, model_id), or None."""
+        return self._get('template', template_name)
+    
+    def set_template(self, template_name: str, template_id: int,
+                     worksheet_model: str, model_id: int):
+        self._set('template', template_name, [template_id, worksheet_model, model_id])
+
+
 class WorksheetTemplateDesigner:
     """
     Designs existing Worksheet Templates in Field Service
     Adds custom fields to the worksheet template model and creates the form view
     """
     
+    # Upper bound on RPCs in flight, to avoid saturating the Odoo workers
+    MAX_CONCURRENT_CALLS = 8
+    
+    # Metadata kept between runs (model ids, field names, templates)
+    CACHE_FILE = '.odoo_designer_cache.json'
+    
+    # Number of queued progress lines written to stdout at once
+    LOG_FLUSH_LINES = 16
+    
     def __init__(self, url: str, db: str, username: str, password: str):
         self.url = url
         self.db = db
         self.username = username
         self.password = password
         self.uid = None
-        self.models = None
-        
-        print(f"🔌 Connecting to {url}...")
+        self.rpc = None
+        self._existing_fields: Dict[str, set] = {}
+        self._model_id_cache: Dict[str, int] = {}
+        self._existing_views: Dict[str, list] = {}
+        self.metadata_cache = MetadataCache(self.CACHE_FILE, url, db)
+        self._log_buf: List[str] = []
+        
+        self._log(f"🔌 Connecting to {url}...")
         self._authenticate()
+        self._flush_log()
+    
+    def _log(self, message: str):
+        """Queue a progress line; lines are written to stdout in blocks."""
+        self._log_buf.append(message)
+        if len(self._log_buf) >= self.LOG_FLUSH_LINES:
+            self._flush_log()
+    
+    def _flush_log(self):
+        """Write all queued progress lines with a single stdout write."""
+        if self._log_buf:
+            sys.stdout.write('\n'.join(self._log_buf) + '\n')
+            sys.stdout.flush()
+            self._log_buf.clear()
     
     def _authenticate(self):
         """Authenticate with Odoo and get user ID."""
-        common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-        
         try:
-            self.uid = common.authenticate(self.db, self.username, self.password, {})
-            if not self.uid:
-                raise Exception("Authentication failed. Check credentials.")
+            self.uid, self.rpc = get_client(self.url, self.db, self.username, self.password)
             
-            self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
-            print(f"✅ Successfully authenticated as user ID: {self.uid}\n")
+            self._log(f"✅ Successfully authenticated as user ID: {self.uid}\n")
             
         except Exception as e:
-            print(f"❌ Authentication error: {e}")
+            self._log(f"❌ Authentication error: {e}")
+            self._flush_log()
             sys.exit(1)
     
     def _execute(self, model: str, method: str, *args, **kwargs):
-        """Execute an Odoo method via XML-RPC."""
-        return self.models.execute_kw(
+        """Execute an Odoo method via JSON-RPC."""
+        return self.rpc.execute_kw(
             self.db, self.uid, self.password,
             model, method, args, kwargs
         )
     
     def find_worksheet_template_by_name(self, template_name: str) -> tuple:
         """Find the worksheet template and its corresponding model."""
+        cached = self.metadata_cache.get_template(template_name)
+        if cached:
+            template_id, worksheet_model, model_id = cached
+            self._model_id_cache[worksheet_model] = model_id
+            self._log(f"  ✅ Found template: '{template_name}' (cached)")
+            self._log(f"  ✅ Template ID: {template_id}")
+            self._log(f"  ✅ Worksheet Model: {worksheet_model}")
+            return template_id, worksheet_model
+        
         try:
-            # Search in worksheet.template
-            template_ids = self._execute(
-                'worksheet.template', 'search',
-                [['name', '=', template_name]]
+            # Search and read the template with its model in one call
+            template_data = self._execute(
+                'worksheet.template', 'search_read',
+                [['name', '=', template_name]],
+                fields=['name', 'model_id'], limit=1
             )
             
-            if not template_ids:
-                print(f"  ❌ Worksheet template '{template_name}' not found")
+            if not template_data:
+                self._log(f"  ❌ Worksheet template '{template_name}' not found")
                 return None, None
             
-            template_id = template_ids[0]
+            template_id = template_data[0]['id']
             
-            # Read the template to get its model
-            template_data = self._execute(
-                'worksheet.template', 'read',
-                [template_id], ['name', 'model_id']
-            )
-            
-            if not template_data or not template_data[0].get('model_id'):
-                print(f"  ❌ Could not find model for template")
+            if not template_data[0].get('model_id'):
+                self._log(f"  ❌ Could not find model for template")
                 return None, None
             
             model_id = template_data[0]['model_id'][0]
             
-            # Get the model technical name
+            # Get the model technical name (model_id only carries the display name)
             model_data = self._execute(
                 'ir.model', 'read',
                 [model_id], ['model', 'name']
             )
             
             if not model_data:
-                print(f"  ❌ Could not read model data")
+                self._log(f"  ❌ Could not read model data")
                 return None, None
             
             worksheet_model = model_data[0]['model']
+            self._model_id_cache[worksheet_model] = model_id
+            self.metadata_cache.set_template(template_name, template_id, worksheet_model, model_id)
             
-            print(f"  ✅ Found template: '{template_name}'")
-            print(f"  ✅ Template ID: {template_id}")
-            print(f"  ✅ Worksheet Model: {worksheet_model}")
+            self._log(f"  ✅ Found template: '{template_name}'")
+            self._log(f"  ✅ Template ID: {template_id}")
+            self._log(f"  ✅ Worksheet Model: {worksheet_model}")
             
             return template_id, worksheet_model
             
         except Exception as e:
-            print(f"  ❌ Error finding template: {e}")
+            self._log(f"  ❌ Error finding template: {e}")
+            self._flush_log()
             import traceback
             traceback.print_exc()
             return None, None
     
-    def check_field_exists(self, model: str, field_name: str) -> bool:
-        """Check if a field already exists on a model."""
+    def _save_metadata(self):
         try:
-            field_ids = self._execute(
-                'ir.model.fields', 'search',
-                [['model', '=', model], ['name', '=', field_name]]
+            self.metadata_cache.save()
+        except OSError as e:
+            self._log(f"  ⚠️ Could not save metadata cache: {e}")
+    
+    def _forget_metadata(self, template_name: str, model: str):
+        """Drop cached metadata that a failed step relied on, and persist that."""
+        self.metadata_cache.forget(template_name, model)
+        self._save_metadata()
+    
+    async def _gather_calls(self, *calls):
+        """Run independent (function, *args) calls concurrently in worker threads."""
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_CALLS)
+        
+        async def run(func, *args):
+            async with semaphore:
+                return await asyncio.to_thread(func, *args)
+        
+        return await asyncio.gather(*(run(*call) for call in calls))
+    
+    def resolve_model_id(self, model: str) -> int:
+        """Return the ir.model id of a model, looking it up only once."""
+        if model not in self._model_id_cache:
+            model_id = self.metadata_cache.get_model_id(model)
+            if model_id is None:
+                model_ids = self._execute('ir.model', 'search', [['model', '=', model]])
+                if not model_ids:
+                    raise Exception(f"Model '{model}' not found")
+                model_id = model_ids[0]
+                self.metadata_cache.set_model_id(model, model_id)
+            self._model_id_cache[model] = model_id
+        return self._model_id_cache[model]
+    
+    def prefetch_existing_fields(self, model: str, use_cache: bool = True) -> set:
+        """Load the names of all fields already defined on a model in one call."""
+        names = self.metadata_cache.get_fields(model) if use_cache else None
+        if names is None:
+            records = self._execute(
+                'ir.model.fields', 'search_read',
+                [['model', '=', model]],
+                fields=['name']
             )
-            return len(field_ids) > 0
-        except:
-            return False
+            names = {r['name'] for r in records}
+            self.metadata_cache.set_fields(model, names)
+        self._existing_fields[model] = names
+        return names
+    
+    def check_field_exists(self, model: str, field_name: str) -> bool:
+        """Check if a field already exists on a model (uses the prefetched names)."""
+        return field_name in self._existing_fields.get(model, set())
+    
+    def _build_field_vals(self, model: str, field_config: Dict[str, Any],
+                          model_id: int, existing: set):
+        """Build the ir.model.fields values for a field, or None if it already exists."""
+        if field_config['name'] in existing:
+            return None
+        
+        ttype = _FIELD_TYPE_MAP.get(field_config['field_type'], 'char')
+        
+        field_values = {
+            **_BASE_FIELD_VALS,
+            'name': field_config['name'],
+            'field_description': field_config['label'],
+            'model_id': model_id,
+            'ttype': ttype,
+            'required': field_config.get('required', False),
+            'readonly': field_config.get('readonly', False),
+        }
+        
+        # Default values are not supported on field creation;
+        # they are set afterwards via ir.default
+        
+        if ttype == 'selection' and 'selection' in field_config:
+            field_values['selection'] = str(field_config['selection'])
+        
+        return field_values
     
     def create_field(self, model: str, field_config: Dict[str, Any]) -> bool:
-        """Create a custom field on the worksheet template model."""
+        """Create a single custom field on the worksheet template model."""
         field_name = field_config['name']
         
         if self.check_field_exists(model, field_name):
-            print(f"  ⊙ Field '{field_name}' already exists, skipping...")
+            self._log(f"  ⊙ Field '{field_name}' already exists, skipping...")
             return True
         
         try:
-            model_ids = self._execute('ir.model', 'search', [['model', '=', model]])
-            if not model_ids:
-                print(f"  ❌ Model '{model}' not found")
-                return False
-            
-            model_id = model_ids[0]
-            
-            field_type_map = {
-                'char': 'char',
-                'text': 'text',
-                'integer': 'integer',
-                'float': 'float',
-                'date': 'date',
-                'datetime': 'datetime',
-                'boolean': 'boolean',
-                'selection': 'selection',
-            }
-            
-            ttype = field_type_map.get(field_config['field_type'], 'char')
-            
-            field_values = {
-                'name': field_name,
-                'field_description': field_config['label'],
-                'model_id': model_id,
-                'ttype': ttype,
-                'state': 'manual',
-                'required': field_config.get('required', False),
-                'readonly': field_config.get('readonly', False),
-            }
-            
-            # REMOVED: Default value setting - not supported via XML-RPC field creation
-            # Default values will be handled in the view or via ir.default separately
-            
-            if ttype == 'selection' and 'selection' in field_config:
-                selection_str = str(field_config['selection'])
-                field_values['selection'] = selection_str
-            
+            field_values = self._build_field_vals(
+                model, field_config, self._model_id_cache[model], set()
+            )
             field_id = self._execute('ir.model.fields', 'create', field_values)
-            print(f"  ✅ Created field '{field_name}' (ID: {field_id})")
-            
-            # Try to set default value using ir.default if specified
-            if 'default_value' in field_config and field_config['default_value']:
-                self.set_field_default(model, field_name, field_config['default_value'])
-            
+            self._existing_fields.setdefault(model, set()).add(field_name)
+            self._log(f"  ✅ Created field '{field_name}' (ID: {field_id})")
             return True
             
         except Exception as e:
-            print(f"  ❌ Error creating field '{field_name}': {e}")
+            self._log(f"  ❌ Error creating field '{field_name}': {e}")
             return False
     
+    def create_fields(self, model: str, fields: List[Dict[str, Any]]) -> List[str]:
+        """
+        Create all missing fields with a single multi-record create call.
+        Falls back to one create per field if the batch is rejected, so that
+        every failing field is reported individually.
+        Returns the names of the fields that could not be created.
+        """
+        existing = self._existing_fields.get(model, set())
+        model_id = self._model_id_cache[model]
+        
+        to_create = []
+        for field_config in fields:
+            field_values = self._build_field_vals(model, field_config, model_id, existing)
+            if field_values is None:
+                self._log(f"  ⊙ Field '{field_config['name']}' already exists, skipping...")
+            else:
+                to_create.append((field_config, field_values))
+        
+        if not to_create:
+            return []
+        
+        default_values = {
+            f['name']: f['default_value'] for f in fields if f.get('default_value')
+        }
+        
+        try:
+            field_ids = self._execute(
+                'ir.model.fields', 'create',
+                [field_values for _, field_values in to_create]
+            )
+        except Exception as e:
+            self._log(f"  ⚠️ Batch create failed ({e}), creating fields one by one...")
+            # The cached field names may be stale; re-read them from the server
+            try:
+                self.prefetch_existing_fields(model, use_cache=False)
+            except Exception as refresh_error:
+                self._log(f"  ❌ Could not re-read fields of '{model}': {refresh_error}")
+                return [field_config['name'] for field_config, _ in to_create]
+            failed_fields = []
+            for field_config, _ in to_create:
+                field_name = field_config['name']
+                if not self.create_field(model, field_config):
+                    failed_fields.append(field_name)
+                elif field_name in default_values:
+                    self.set_field_default(model, field_name, default_values[field_name])
+            return failed_fields
+        
+        defaults = []
+        for (field_config, _), field_id in zip(to_create, field_ids):
+            field_name = field_config['name']
+            existing.add(field_name)
+            self._log(f"  ✅ Created field '{field_name}' (ID: {field_id})")
+            if field_name in default_values:
+                defaults.append((field_id, field_name, default_values[field_name]))
+        
+        if defaults:
+            self.set_field_defaults(model, defaults)
+        
+        return []
+    
     def set_field_default(self, model: str, field_name: str, default_value: Any) -> bool:
         """Set default value for a field using ir.default."""
         try:
             # Use ir.default to set default values
             self._execute('ir.default', 'set', 
                          model, field_name, default_value)
-            print(f"    ↳ Set default value for '{field_name}'")
+            self._log(f"    ↳ Set default value for '{field_name}'")
             return True
         except Exception as e:
-            print(f"    ⚠️ Could not set default for '{field_name}': {e}")
+            self._log(f"    ⚠️ Could not set default for '{field_name}': {e}")
             return False
     
+    def set_field_defaults(self, model: str, defaults: List[tuple]) -> None:
+        """
+        Set default values for several new fields with one ir.default create.
+        `defaults` holds (field_id, field_name, default_value) tuples; if the
+        batch is rejected, each default is set separately via ir.default.set.
+        """
+        try:
+            self._execute('ir.default', 'create', [
+                {'field_id': field_id, 'json_value': json.dumps(default_value)}
+                for field_id, _, default_value in defaults
+            ])
+            for _, field_name, _ in defaults:
+                self._log(f"    ↳ Set default value for '{field_name}'")
+        except Exception as e:
+            self._log(f"  ⚠️ Batch default failed ({e}), setting defaults one by one...")
+            for _, field_name, default_value in defaults:
+                self.set_field_default(model, field_name, default_value)
+    
     def generate_worksheet_xml_vibracion(self, template_config: Dict[str, Any]) -> str:
         """Generate XML for Vibration test worksheet."""
-        template_name = template_config['template_name']
-        
-        # Get default values from config
-        default_objective = ""
-        default_procedure = ""
-        default_method = ""
-        default_criteria = ""
-        
-        for field in template_config['fields']:
-            if field['name'] == 'x_test_objective' and 'default_value' in field:
-                default_objective = field['default_value']
-            elif field['name'] == 'x_test_procedure' and 'default_value' in field:
-                default_procedure = field['default_value']
-            elif field['name'] == 'x_test_method' and 'default_value' in field:
-                default_method = field['default_value']
-            elif field['name'] == 'x_acceptance_criteria' and 'default_value' in field:
-                default_criteria = field['default_value']
-        
-        xml = '''<form string="''' + template_name + '''">
-    <sheet>
-        <div class="oe_title">
-            <h1>Test de vibración</h1>
-        </div>
-        
-        <group string="Información del Equipo" col="2">
-            <field name="x_assistance_code"/>
-            <field name="x_client"/>
-            <field name="x_model"/>
-            <field name="x_project"/>
-            <field name="x_serial_number"/>
-        </group>
-        
-        <separator string="1. Test de vibración"/>
-        
-        <group string="1.1. Objetivo">
-            <field name="x_test_objective" widget="text" readonly="1"/>
-        </group>
-        
-        <group string="1.2. Procedimiento">
-            <field name="x_test_procedure" widget="text" readonly="1"/>
-        </group>
-        
-        <group string="1.3. Método">
-            <field name="x_test_method" widget="text" readonly="1"/>
-        </group>
-        
-        <group string="1.4. Criterio de aceptación">
-            <field name="x_acceptance_criteria" widget="text" readonly="1"/>
-        </group>
-        
-        <separator string="1.5. Instrumento de medición"/>
-        
-        <group col="4">
-            <field name="x_instrument_brand_model"/>
-            <field name="x_instrument_serial"/>
-            <field name="x_calibration_certificate"/>
-            <field name="x_calibration_date"/>
-        </group>
-        
-        <separator string="1.6. Datos de la prueba - Reglajes"/>
-        
-        <group col="4">
-            <field name="x_limit_1"/>
-            <field name="x_limit_2"/>
-            <field name="x_max_speed"/>
-            <field name="x_test_weights"/>
-        </group>
-        
-        <separator string="Ensayo 1"/>
-        <group col="4">
-            <field name="x_test_1_imbalance"/>
-            <newline/>
-            <field name="x_test_1_speed_50"/>
-            <field name="x_test_1_vibration_50"/>
-            <field name="x_test_1_speed_75"/>
-            <field name="x_test_1_vibration_75"/>
-            <field name="x_test_1_speed_100"/>
-            <field name="x_test_1_vibration_100"/>
-        </group>
-        <group>
-            <field name="x_test_1_comments" widget="text" nolabel="1" placeholder="Comentarios Ensayo 1"/>
-        </group>
-        
-        <separator string="Ensayo 2"/>
-        <group col="4">
-            <field name="x_test_2_imbalance"/>
-            <newline/>
-            <field name="x_test_2_speed_50"/>
-            <field name="x_test_2_vibration_50"/>
-            <field name="x_test_2_speed_75"/>
-            <field name="x_test_2_vibration_75"/>
-            <field name="x_test_2_speed_100"/>
-            <field name="x_test_2_vibration_100"/>
-        </group>
-        <group>
-            <field name="x_test_2_comments" widget="text" nolabel="1" placeholder="Comentarios Ensayo 2"/>
-        </group>
-        
-        <separator string="Ensayo 3"/>
-        <group col="4">
-            <field name="x_test_3_imbalance"/>
-            <newline/>
-            <field name="x_test_3_speed_50"/>
-            <field name="x_test_3_vibration_50"/>
-            <field name="x_test_3_speed_75"/>
-            <field name="x_test_3_vibration_75"/>
-            <field name="x_test_3_speed_100"/>
-            <field name="x_test_3_vibration_100"/>
-        </group>
-        <group>
-            <field name="x_test_3_comments" widget="text" nolabel="1" placeholder="Comentarios Ensayo 3"/>
-        </group>
-        
-        <separator string="1.7. Resultados test"/>
-        
-        <group>
-            <field name="x_test_comments" widget="text" placeholder="Comentarios generales"/>
-            <field name="x_result_status" widget="radio"/>
-        </group>
-        
-        <separator/>
-        
-        <group col="4">
-            <field name="x_performed_by"/>
-            <field name="x_department"/>
-            <field name="x_test_date"/>
-            <field name="x_signature"/>
-        </group>
-        
-    </sheet>
-</form>'''
-        
-        return xml
+        return _build_vibracion_xml(template_config['template_name'])
+    
+    def find_worksheet_view(self, worksheet_model: str) -> list:
+        """Find the designer's form view for a worksheet model, with its stored arch."""
+        if worksheet_model not in self._existing_views:
+            view_name = f"view_{worksheet_model.replace('.', '_')}_form"
+            self._existing_views[worksheet_model] = self._execute(
+                'ir.ui.view', 'search_read',
+                [['name', '=', view_name], ['model', '=', worksheet_model]],
+                fields=['arch_db']
+            )
+        return self._existing_views[worksheet_model]
+    
+    def view_is_current(self, worksheet_model: str, view_xml: str) -> bool:
+        """Check whether the existing form view already has exactly this arch."""
+        existing_views = self.find_worksheet_view(worksheet_model)
+        return bool(existing_views) and (
+            _arch_digest(existing_views[0]['arch_db'] or '') == _arch_digest(view_xml)
+        )
     
     def create_worksheet_view(self, worksheet_model: str, template_config: Dict[str, Any]) -> int:
         """Create the form view for the worksheet template."""
@@ -320,18 +524,22 @@ class WorksheetTemplateDesigner:
             view_xml = self.generate_worksheet_xml_vibracion(template_config)
             
             # Check if view exists
-            existing_views = self._execute(
-                'ir.ui.view', 'search',
-                [['name', '=', view_name], ['model', '=', worksheet_model]]
-            )
+            existing_views = self.find_worksheet_view(worksheet_model)
             
             if existing_views:
-                print(f"  ⊙ View '{view_name}' already exists, updating...")
-                view_id = existing_views[0]
+                view_id = existing_views[0]['id']
+                # Rewriting the arch makes Odoo revalidate the view and drops
+                # client caches, so only write when the content changed
+                if self.view_is_current(worksheet_model, view_xml):
+                    self._log(f"  ⊙ View '{view_name}' unchanged (ID: {view_id})")
+                    return view_id
+                
+                self._log(f"  ⊙ View '{view_name}' already exists, updating...")
                 self._execute('ir.ui.view', 'write', [view_id], {
                     'arch': view_xml,
                 })
-                print(f"  ✅ Updated view (ID: {view_id})")
+                existing_views[0]['arch_db'] = view_xml
+                self._log(f"  ✅ Updated view (ID: {view_id})")
                 return view_id
             
             # Create new view
@@ -344,11 +552,13 @@ class WorksheetTemplateDesigner:
             }
             
             view_id = self._execute('ir.ui.view', 'create', view_values)
-            print(f"  ✅ Created worksheet view '{view_name}' (ID: {view_id})")
+            self._existing_views[worksheet_model] = [{'id': view_id, 'arch_db': view_xml}]
+            self._log(f"  ✅ Created worksheet view '{view_name}' (ID: {view_id})")
             return view_id
             
         except Exception as e:
-            print(f"  ❌ Error creating view: {e}")
+            self._log(f"  ❌ Error creating view: {e}")
+            self._flush_log()
             import traceback
             traceback.print_exc()
             return None
@@ -359,29 +569,34 @@ class WorksheetTemplateDesigner:
         Adds fields and creates the form view.
         """
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                template = json.load(f)
+            return self._design_template(json_path)
+        finally:
+            self._flush_log()
+    
+    def _design_template(self, json_path: str) -> Dict[str, Any]:
+        try:
+            template = load_json(json_path)
         except Exception as e:
-            print(f"❌ Error loading JSON: {e}")
+            self._log(f"❌ Error loading JSON: {e}")
             return {'success': False, 'error': str(e)}
         
         template_name = template['template_name']
         fields = template['fields']
         
-        print(f"{'='*70}")
-        print(f"🎨 WORKSHEET TEMPLATE DESIGNER")
-        print(f"{'='*70}")
-        print(f"Template: {template_name}")
-        print(f"Fields to add: {len(fields)}")
-        print(f"{'='*70}\n")
+        self._log(f"{'='*70}")
+        self._log(f"🎨 WORKSHEET TEMPLATE DESIGNER")
+        self._log(f"{'='*70}")
+        self._log(f"Template: {template_name}")
+        self._log(f"Fields to add: {len(fields)}")
+        self._log(f"{'='*70}\n")
         
         # Step 1: Find the worksheet template and its model
-        print("🔍 STEP 1: Finding worksheet template...")
+        self._log("🔍 STEP 1: Finding worksheet template...")
         template_id, worksheet_model = self.find_worksheet_template_by_name(template_name)
         
         if not template_id or not worksheet_model:
-            print("\n❌ Could not find the worksheet template!")
-            print("💡 Make sure you created it in Field Service → Configuration → Worksheet Templates")
+            self._log("\n❌ Could not find the worksheet template!")
+            self._log("💡 Make sure you created it in Field Service → Configuration → Worksheet Templates")
             return {'success': False}
         
         results = {
@@ -395,33 +610,77 @@ class WorksheetTemplateDesigner:
         }
         
         # Step 2: Add custom fields to the worksheet model
-        print(f"\n📝 STEP 2: Adding custom fields to '{worksheet_model}'...")
+        self._log(f"\n📝 STEP 2: Adding custom fields to '{worksheet_model}'...")
+        try:
+            # Independent metadata lookups, issued concurrently
+            _, existing, _ = asyncio.run(self._gather_calls(
+                (self.resolve_model_id, worksheet_model),
+                (self.prefetch_existing_fields, worksheet_model),
+                (self.find_worksheet_view, worksheet_model),
+            ))
+            self._log(f"  ⊙ {len(existing)} fields already defined on the model")
+        except Exception as e:
+            self._log(f"  ❌ Error reading model metadata: {e}")
+            # The cached template may be stale (deleted and recreated)
+            self._forget_metadata(template_name, worksheet_model)
+            return {'success': False, 'error': str(e)}
+        
+        # Reject invalid field definitions before they cost a round trip
+        valid_fields = []
         for idx, field_config in enumerate(fields, 1):
-            print(f"[{idx}/{len(fields)}] {field_config['name']}")
-            success = self.create_field(worksheet_model, field_config)
-            
-            if success:
-                results['created'] += 1
+            error = _field_config_error(field_config)
+            if error:
+                # Fields without a usable name are reported by position
+                name = field_config.get('name') if isinstance(field_config, dict) else None
+                label = name if isinstance(name, str) and name else f"#{idx}"
+                self._log(f"  ❌ Invalid field '{label}': {error}")
+                results['failed_fields'].append(label)
             else:
-                results['failed'] += 1
-                results['failed_fields'].append(field_config['name'])
+                valid_fields.append(field_config)
+        results['failed'] = len(results['failed_fields'])
+        
+        # Fast path: every field exists and the view is up to date
+        to_create = [f for f in valid_fields if f['name'] not in existing]
+        existing_views = self._existing_views[worksheet_model]
+        if not to_create and self.view_is_current(
+                worksheet_model, self.generate_worksheet_xml_vibracion(template)):
+            self._log("  ⊙ All fields exist and the form view is up to date, nothing to do")
+            # Counted like the normal path, where existing fields count as created
+            results['created'] = len(valid_fields)
+            results['view_id'] = existing_views[0]['id']
+            results['success'] = True
+            self._save_metadata()
+            return results
+        
+        failed_fields = self.create_fields(worksheet_model, valid_fields)
+        if failed_fields:
+            # Failures may come from stale metadata: look it all up again next run
+            self.metadata_cache.forget(template_name, worksheet_model)
+        else:
+            self.metadata_cache.set_fields(worksheet_model, self._existing_fields[worksheet_model])
+        results['created'] = len(valid_fields) - len(failed_fields)
+        results['failed_fields'] += failed_fields
+        results['failed'] = len(results['failed_fields'])
         
         # Step 3: Create the worksheet form view
-        print(f"\n🎨 STEP 3: Creating worksheet form view...")
+        self._log(f"\n🎨 STEP 3: Creating worksheet form view...")
         view_id = self.create_worksheet_view(worksheet_model, template)
         results['view_id'] = view_id
+        if view_id is None:
+            self.metadata_cache.forget(template_name, worksheet_model)
+        self._save_metadata()
         
         # Summary
-        print(f"\n{'='*70}")
-        print(f"✅ WORKSHEET DESIGN COMPLETE!")
-        print(f"{'='*70}")
-        print(f"Template: {template_name} (ID: {template_id})")
-        print(f"Model: {worksheet_model}")
-        print(f"Fields created: {results['created']}/{results['total_fields']}")
-        print(f"Form view: {'✅' if view_id else '❌'} (ID: {view_id})")
+        self._log(f"\n{'='*70}")
+        self._log(f"✅ WORKSHEET DESIGN COMPLETE!")
+        self._log(f"{'='*70}")
+        self._log(f"Template: {template_name} (ID: {template_id})")
+        self._log(f"Model: {worksheet_model}")
+        self._log(f"Fields created: {results['created']}/{results['total_fields']}")
+        self._log(f"Form view: {'✅' if view_id else '❌'} (ID: {view_id})")
         if results['failed_fields']:
-            print(f"Failed fields: {', '.join(results['failed_fields'])}")
-        print(f"{'='*70}\n")
+            self._log(f"Failed fields: {', '.join(results['failed_fields'])}")
+        self._log(f"{'='*70}\n")
         
         results['success'] = view_id is not None
         return results
@@ -441,8 +700,7 @@ def main():
         print("❌ ERROR: config.json not found!")
         sys.exit(1)
     
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    config = load_json('config.json')
     
     ODOO_URL = config['odoo_url'].rstrip('/')
     ODOO_DB = config['odoo_db']
@@ -0,0 +1,267 @@
+"""
+Shared Odoo connection helpers for the worksheet scripts
+Keep-alive JSON-RPC and XML-RPC transports, authenticated client caches,
+JSON file loading and caching
+"""
+import collections
+import functools
+import gzip
+import hashlib
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.parse
+import xmlrpc.client
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib parser
+    orjson = None
+
+
+def load_json(path: str) -> Any:
+    """Read a JSON file, parsing it with orjson when it is installed."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+# Authenticated uids are reused for this long before logging in again
+UID_CACHE_TTL = 3600
+
+
+def _uid_cache_path(url: str, db: str, username: str, password: str) -> str:
+    key = hashlib.sha256('\0'.join((url, db, username, password)).encode()).hexdigest()
+    return os.path.join(os.path.expanduser('~/.cache'), f'odoo_uid_{key[:32]}.json')
+
+
+def load_cached_uid(url: str, db: str, username: str, password: str):
+    """Return the uid cached for these credentials, or None if missing or expired."""
+    path = _uid_cache_path(url, db, username, password)
+    try:
+        if time.time() - os.path.getmtime(path) >= UID_CACHE_TTL:
+            return None
+        return load_json(path).get('uid')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_json_atomic(path: str, data: Any):
+    """Write a JSON file through a per-process temporary file, so concurrent runs don't clash."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def save_cached_uid(url: str, db: str, username: str, password: str, uid: int):
+    """Remember the uid of these credentials, writing the cache file atomically."""
+    try:
+        _write_json_atomic(_uid_cache_path(url, db, username, password), {'uid': uid})
+    except OSError:
+        pass  # the cache is only an optimization
+
+
+class JsonFileCache:
+    """
+    String-keyed cache persisted to a JSON file between runs
+    Entries expire after `ttl` seconds; with `maxsize`, the least recently
+    used entries are evicted first
+    """
+    
+    def __init__(self, path: str, ttl: float = 3600, maxsize: int = None):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        """Load the unexpired entries of the cache file, if there is one."""
+        try:
+            entries = load_json(self.path)
+            now = time.time()
+            fresh = [(key, entry) for key, entry in entries.items() if now - entry['ts'] < self.ttl]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return  # missing or malformed: start empty
+        self._entries.update(fresh)
+    
+    def save(self):
+        """Write the cache file atomically."""
+        with self._lock:
+            entries = dict(self._entries)
+        _write_json_atomic(self.path, entries)
+    
+    def get(self, key: str, default=None):
+        """Return the cached value of a key, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if time.time() - entry['ts'] >= self.ttl:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry['data']
+    
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = {'ts': time.time(), 'data': value}
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+    
+    def pop(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class KeepAliveTransport(xmlrpc.client.SafeTransport):
+    """
+    XML-RPC transport keeping one persistent connection per thread
+    Lets a single ServerProxy be shared safely by worker threads
+    """
+    
+    # Connections idle for longer than this are reopened instead of reused,
+    # since the server has most likely dropped them by then
+    IDLE_TIMEOUT = 30
+    
+    def __init__(self, use_https: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.use_https = use_https
+        self._local = threading.local()
+    
+    def make_connection(self, host):
+        cached = getattr(self._local, 'connection', None)
+        now = time.monotonic()
+        if cached and cached[0] == host and now - cached[2] < self.IDLE_TIMEOUT:
+            self._local.connection = host, cached[1], now
+            return cached[1]
+        if cached:
+            cached[1].close()
+        
+        chost, extra_headers, x509 = self.get_host_info(host)
+        self._extra_headers = (extra_headers or []) + [('Connection', 'keep-alive')]
+        if self.use_https:
+            connection = http.client.HTTPSConnection(
+                chost, None, context=self.context, **(x509 or {})
+            )
+        else:
+            connection = http.client.HTTPConnection(chost)
+        self._local.connection = host, connection, now
+        return connection
+    
+    def close(self):
+        cached = getattr(self._local, 'connection', None)
+        if cached:
+            self._local.connection = None
+            cached[1].close()
+
+
+class OdooRpcError(Exception):
+    """Error reported by the Odoo JSON-RPC endpoint."""
+
+
+class JsonRpcConnection:
+    """
+    Persistent keep-alive connection to Odoo's /jsonrpc endpoint
+    A single TCP/TLS handshake is shared by every call of a run;
+    each thread gets its own connection so calls can run concurrently
+    """
+    
+    def __init__(self, url: str, timeout: float = 60):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.netloc
+        self.path = parts.path.rstrip('/') + '/jsonrpc'
+        self.timeout = timeout
+        if parts.scheme == 'https':
+            self._connection_class = http.client.HTTPSConnection
+        else:
+            self._connection_class = http.client.HTTPConnection
+        self._local = threading.local()
+        self._request_ids = itertools.count(1)
+    
+    def close(self):
+        """Close the current thread's HTTP connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+    
+    def _post(self, body: bytes) -> bytes:
+        """POST a request body, reconnecting once if an idle connection was dropped."""
+        headers = {
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+            'Accept-Encoding': 'gzip',
+        }
+        while True:
+            connection = getattr(self._local, 'connection', None)
+            reused = connection is not None
+            if not reused:
+                connection = self._connection_class(self.host, timeout=self.timeout)
+                self._local.connection = connection
+            try:
+                connection.request('POST', self.path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if reused:
+                    continue
+                raise
+            if response.will_close:
+                self.close()
+            if response.status != 200:
+                raise OdooRpcError(f"HTTP {response.status} {response.reason}")
+            if response.getheader('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+            return data
+    
+    def execute_kw(self, *args):
+        """Call execute_kw on the 'object' service, like the XML-RPC proxy."""
+        return self.call('object', 'execute_kw', *args)
+    
+    def call(self, service: str, method: str, *args):
+        """Call a method of an Odoo RPC service ('common', 'object', ...)."""
+        return self._rpc({'service': service, 'method': method, 'args': args})
+    
+    def _rpc(self, params: dict) -> Any:
+        """Send one JSON-RPC 'call' request and return its result."""
+        payload = {
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': params,
+            'id': next(self._request_ids),
+        }
+        reply = json.loads(self._post(json.dumps(payload).encode('utf-8')))
+        
+        error = reply.get('error')
+        if error:
+            data = error.get('data') or {}
+            raise OdooRpcError(data.get('message') or error.get('message'))
+        return reply['result']
+
+
+@functools.lru_cache(maxsize=4)
+def get_client(url: str, db: str, username: str, password: str) -> tuple:
+    """
+    Authenticate once per set of credentials and return (uid, models)
+    `models.execute_kw` has the same signature as the XML-RPC object proxy;
+    later calls with the same credentials reuse the authenticated client
+    """
+    models = JsonRpcConnection(url)
+    uid = models.call('common', 'authenticate', db, username, password, {})
+    if not uid:
+        models.close()
+        raise OdooRpcError("Authentication failed. Check credentials.")
+    return uid, models
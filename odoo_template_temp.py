@@ -1,174 +1,47 @@
-import xmlrpc.client
-import json
+import http.client
+import logging
 import sys
 import os
-from typing import Dict, List, Any
+import time
+import traceback
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional
+from xml.sax.saxutils import escape
 
-class WorksheetTemplateDesigner:
-    """
-    Designs existing Worksheet Templates in Field Service
-    Adds custom fields to the worksheet template model and creates the form view
-    """
-    
-    def __init__(self, url: str, db: str, username: str, password: str):
-        self.url = url
-        self.db = db
-        self.username = username
-        self.password = password
-        self.uid = None
-        self.models = None
-        
-        print(f"🔌 Connecting to {url}...")
-        self._authenticate()
-    
-    def _authenticate(self):
-        """Authenticate with Odoo and get user ID."""
-        common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-        
-        try:
-            self.uid = common.authenticate(self.db, self.username, self.password, {})
-            if not self.uid:
-                raise Exception("Authentication failed. Check credentials.")
-            
-            self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
-            print(f"✅ Successfully authenticated as user ID: {self.uid}\n")
-            
-        except Exception as e:
-            print(f"❌ Authentication error: {e}")
-            sys.exit(1)
-    
-    def _execute(self, model: str, method: str, *args, **kwargs):
-        """Execute an Odoo method via XML-RPC."""
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model, method, args, kwargs
-        )
-    
-    def find_worksheet_template_by_name(self, template_name: str) -> tuple:
-        """Find the worksheet template and its corresponding model."""
-        try:
-            # Search in worksheet.template
-            template_ids = self._execute(
-                'worksheet.template', 'search',
-                [['name', '=', template_name]]
-            )
-            
-            if not template_ids:
-                print(f"  ❌ Worksheet template '{template_name}' not found")
-                return None, None
-            
-            template_id = template_ids[0]
-            
-            # Read the template to get its model
-            template_data = self._execute(
-                'worksheet.template', 'read',
-                [template_id], ['name', 'model_id']
-            )
-            
-            if not template_data or not template_data[0].get('model_id'):
-                print(f"  ❌ Could not find model for template")
-                return None, None
-            
-            model_id = template_data[0]['model_id'][0]
-            
-            # Get the model technical name
-            model_data = self._execute(
-                'ir.model', 'read',
-                [model_id], ['model', 'name']
-            )
-            
-            if not model_data:
-                print(f"  ❌ Could not read model data")
-                return None, None
-            
-            worksheet_model = model_data[0]['model']
-            
-            print(f"  ✅ Found template: '{template_name}'")
-            print(f"  ✅ Template ID: {template_id}")
-            print(f"  ✅ Worksheet Model: {worksheet_model}")
-            
-            return template_id, worksheet_model
-            
-        except Exception as e:
-            print(f"  ❌ Error finding template: {e}")
-            import traceback
-            traceback.print_exc()
-            return None, None
-    
-    def check_field_exists(self, model: str, field_name: str) -> bool:
-        """Check if a field already exists on a model."""
-        try:
-            field_ids = self._execute(
-                'ir.model.fields', 'search',
-                [['model', '=', model], ['name', '=', field_name]]
-            )
-            return len(field_ids) > 0
-        except:
-            return False
-    
-    def create_field(self, model: str, field_config: Dict[str, Any]) -> bool:
-        """Create a custom field on the worksheet template model."""
-        field_name = field_config['name']
-        
-        if self.check_field_exists(model, field_name):
-            print(f"  ⊙ Field '{field_name}' already exists, skipping...")
-            return True
-        
-        try:
-            model_ids = self._execute('ir.model', 'search', [['model', '=', model]])
-            if not model_ids:
-                print(f"  ❌ Model '{model}' not found")
-                return False
-            
-            model_id = model_ids[0]
-            
-            field_type_map = {
-                'char': 'char',
-                'text': 'text',
-                'integer': 'integer',
-                'float': 'float',
-                'date': 'date',
-                'datetime': 'datetime',
-                'boolean': 'boolean',
-                'selection': 'selection',
-            }
-            
-            ttype = field_type_map.get(field_config['field_type'], 'char')
-            
-            field_values = {
-                'name': field_name,
-                'field_description': field_config['label'],
-                'model_id': model_id,
-                'ttype': ttype,
-                'state': 'manual',
-                'required': field_config.get('required', False),
-                'readonly': field_config.get('readonly', False),
-            }
-            
-            # Add default value if specified
-            if 'default_value' in field_config and field_config['default_value']:
-                field_values['default'] = field_config['default_value']
-            
-            if ttype == 'selection' and 'selection' in field_config:
-                selection_str = str(field_config['selection'])
-                field_values['selection'] = selection_str
-            
-            field_id = self._execute('ir.model.fields', 'create', field_values)
-            print(f"  ✅ Created field '{field_name}' (ID: {field_id})")
-            return True
-            
-        except Exception as e:
-            print(f"  ❌ Error creating field '{field_name}': {e}")
-            return False
-    
-    def generate_worksheet_xml_hermiticity(self, template_config: Dict[str, Any]) -> str:
-        """Generate XML for Hermiticity test worksheet."""
-        template_name = template_config['template_name']
-        
-        xml = '''<form string="''' + template_name + '''">
+from odoo_client import OdooRpcError, get_client, load_json
+
+logger = logging.getLogger(__name__)
+
+# Template field_type -> Odoo ttype; anything else is created as char
+FIELD_TYPE_MAP = MappingProxyType({
+    'char': 'char',
+    'text': 'text',
+    'integer': 'integer',
+    'float': 'float',
+    'date': 'date',
+    'datetime': 'datetime',
+    'boolean': 'boolean',
+    'selection': 'selection',
+})
+
+# Failures of a single RPC: server-side errors and transport problems
+_RPC_ERRORS = (OdooRpcError, OSError, http.client.HTTPException)
+
+# Failures of a design step: RPC errors and unexpected reply shapes
+_DESIGN_ERRORS = _RPC_ERRORS + (KeyError, IndexError, TypeError)
+
+
+def _xml_attr(value: str) -> str:
+    """Escape a value for use in XML text or a double-quoted attribute."""
+    return escape(value, {'"': '&quot;'})
+
+
+# Form view archs; each is split once at import around its $name placeholders
+_HERMITICITY_ARCH = '''<form string="$name">
     <sheet>
         <div class="oe_title">
-            <h1>''' + template_name + '''</h1>
+            <h1>$name</h1>
         </div>
         
         <group string="Información del Equipo" col="2">
@@ -229,14 +102,8 @@ class WorksheetTemplateDesigner:
         
     </sheet>
 </form>'''
-        
-        return xml
-    
-    def generate_worksheet_xml_temperatura(self, template_config: Dict[str, Any]) -> str:
-        """Generate XML for Temperature test worksheet."""
-        template_name = template_config['template_name']
-        
-        xml = '''<form string="''' + template_name + '''">
+
+_TEMPERATURA_ARCH = '''<form string="$name">
     <sheet>
         <div class="oe_title">
             <h1>Test de temperatura de rodamientos</h1>
@@ -297,37 +164,441 @@ class WorksheetTemplateDesigner:
         
     </sheet>
 </form>'''
+
+_HERMITICITY_ARCH_PARTS = tuple(_HERMITICITY_ARCH.split('$name'))
+_TEMPERATURA_ARCH_PARTS = tuple(_TEMPERATURA_ARCH.split('$name'))
+
+
+@dataclass(frozen=True, slots=True)
+class FieldSpec:
+    """One custom field of a template, validated."""
+    name: str
+    label: str
+    field_type: str
+    required: bool = False
+    readonly: bool = False
+    default_value: Any = None
+    selection: Optional[list] = None
+
+
+@dataclass(frozen=True, slots=True)
+class TemplateSpec:
+    """A worksheet template definition, validated."""
+    template_name: str
+    fields: tuple
+    template_code: str = ''
+
+
+def parse_template(data: Dict[str, Any]) -> TemplateSpec:
+    """
+    Validate a template config in one pass and convert it to a TemplateSpec.
+    Raises ValueError listing every problem found.
+    """
+    errors = []
+    if not isinstance(data, dict):
+        raise ValueError("template must be a JSON object")
+    
+    template_name = data.get('template_name')
+    if not isinstance(template_name, str) or not template_name:
+        errors.append("'template_name' must be a non-empty string")
+    template_code = data.get('template_code') or ''
+    if not isinstance(template_code, str):
+        errors.append("'template_code' must be a string")
+    raw_fields = data.get('fields')
+    if not isinstance(raw_fields, list):
+        errors.append("'fields' must be a list")
+        raw_fields = []
+    
+    fields = []
+    for idx, raw in enumerate(raw_fields, 1):
+        if not isinstance(raw, dict):
+            errors.append(f"field #{idx}: must be an object")
+            continue
+        where = f"field #{idx} ({raw.get('name', '?')})"
+        problems = [
+            f"'{key}' must be a non-empty string"
+            for key in ('name', 'label', 'field_type')
+            if not isinstance(raw.get(key), str) or not raw.get(key)
+        ]
+        problems += [
+            f"'{key}' must be true or false"
+            for key in ('required', 'readonly')
+            if not isinstance(raw.get(key, False), bool)
+        ]
+        if raw.get('selection') is not None and not isinstance(raw['selection'], list):
+            problems.append("'selection' must be a list of [value, label] pairs")
+        if problems:
+            errors.extend(f"{where}: {problem}" for problem in problems)
+            continue
+        fields.append(FieldSpec(
+            name=raw['name'],
+            label=raw['label'],
+            field_type=raw['field_type'],
+            required=raw.get('required', False),
+            readonly=raw.get('readonly', False),
+            default_value=raw.get('default_value'),
+            selection=raw.get('selection'),
+        ))
+    
+    if errors:
+        raise ValueError("invalid template: " + "; ".join(errors))
+    return TemplateSpec(template_name, tuple(fields), template_code)
+
+
+class WorksheetTemplateDesigner:
+    """
+    Designs existing Worksheet Templates in Field Service
+    Adds custom fields to the worksheet template model and creates the form view
+    """
+    
+    # Seconds a model's field list is trusted before it is fetched again
+    FIELD_CACHE_TTL = 300
+    
+    # Module part of the external ID given to generated views
+    VIEW_XMLID_MODULE = '__custom__'
+    
+    # One-call designer added by the worksheet_designer_rpc addon
+    SERVER_DESIGN_METHOD = 'design_from_spec'
+    
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 server_design: bool = False):
+        self.url = url
+        self.db = db
+        self.username = username
+        self.password = password
+        self.uid = None
+        self.rpc = None
+        # model -> (existing field names, time.monotonic() when fetched)
+        self._field_cache: Dict[str, tuple] = {}
+        self._existing_views: Dict[str, Any] = {}
+        self._model_id_cache: Dict[str, int] = {}
+        self._template_cache: Dict[str, tuple] = {}
+        # Opt-in: only servers with the worksheet_designer_rpc addon support it
+        self._server_design = server_design
+        
+        logger.info(f"🔌 Connecting to {url}...")
+        self._authenticate()
+    
+    def _authenticate(self):
+        """Authenticate with Odoo and get user ID."""
+        try:
+            # common.authenticate accepts API keys, unlike the interactive
+            # /web/session/authenticate login
+            self.uid, self.rpc = get_client(self.url, self.db, self.username, self.password)
+            logger.info(f"✅ Successfully authenticated as user ID: {self.uid}\n")
+            
+        except Exception as e:
+            logger.error(f"❌ Authentication error: {e}")
+            sys.exit(1)
+    
+    def _execute(self, model: str, method: str, *args, **kwargs):
+        """Execute an Odoo method via JSON-RPC."""
+        return self.rpc.execute_kw(
+            self.db, self.uid, self.password,
+            model, method, args, kwargs
+        )
+    
+    def find_worksheet_template_by_name(self, template_name: str) -> tuple:
+        """Find the worksheet template and its corresponding model."""
+        if template_name in self._template_cache:
+            logger.info(f"  ✅ Found template: '{template_name}' (cached)")
+            return self._template_cache[template_name]
+        
+        try:
+            # Search the template and read its model in the same call
+            template_data = self._execute(
+                'worksheet.template', 'search_read',
+                [['name', '=', template_name]],
+                fields=['name', 'model_id'], limit=1
+            )
+            
+            if not template_data:
+                logger.error(f"  ❌ Worksheet template '{template_name}' not found")
+                return None, None
+            
+            template_id = template_data[0]['id']
+            
+            if not template_data[0].get('model_id'):
+                logger.error(f"  ❌ Could not find model for template")
+                return None, None
+            
+            model_id = template_data[0]['model_id'][0]
+            
+            # Get the model technical name
+            model_data = self._execute(
+                'ir.model', 'search_read',
+                [['id', '=', model_id]],
+                fields=['model'], limit=1
+            )
+            
+            if not model_data:
+                logger.error(f"  ❌ Could not read model data")
+                return None, None
+            
+            worksheet_model = model_data[0]['model']
+            self._model_id_cache[worksheet_model] = model_id
+            
+            logger.info(f"  ✅ Found template: '{template_name}'")
+            logger.info(f"  ✅ Template ID: {template_id}")
+            logger.info(f"  ✅ Worksheet Model: {worksheet_model}")
+            
+            self._template_cache[template_name] = (template_id, worksheet_model)
+            return template_id, worksheet_model
+            
+        except _DESIGN_ERRORS as e:
+            logger.error(f"  ❌ Error finding template: {e}")
+            logger.debug("Error finding template", exc_info=True)
+            return None, None
+    
+    def prefetch_existing_fields(self, model: str) -> set:
+        """Fetch the names of every field on a model in one call and cache them."""
+        records = self._execute(
+            'ir.model.fields', 'search_read',
+            [['model', '=', model]],
+            fields=['name']
+        )
+        names = {r['name'] for r in records}
+        self._field_cache[model] = (names, time.monotonic())
+        return names
+    
+    def _cached_fields(self, model: str):
+        """Return the cached field names of a model, or None if missing or stale."""
+        cached = self._field_cache.get(model)
+        if cached and time.monotonic() - cached[1] < self.FIELD_CACHE_TTL:
+            return cached[0]
+        return None
+    
+    def _remember_field(self, model: str, field_name: str):
+        """Record a newly created field in the cache."""
+        if model in self._field_cache:
+            self._field_cache[model][0].add(field_name)
+    
+    def check_field_exists(self, model: str, field_name: str) -> bool:
+        """Check if a field already exists on a model."""
+        names = self._cached_fields(model)
+        if names is not None:
+            return field_name in names
+        
+        try:
+            return field_name in self.prefetch_existing_fields(model)
+        except _RPC_ERRORS:
+            return False
+    
+    def _build_field_values(self, model_id: int, field_config: FieldSpec) -> Dict[str, Any]:
+        """Build the ir.model.fields values for one field config."""
+        ttype = FIELD_TYPE_MAP.get(field_config.field_type, 'char')
+        
+        field_values = {
+            'name': field_config.name,
+            'field_description': field_config.label,
+            'model_id': model_id,
+            'ttype': ttype,
+            'state': 'manual',
+            'required': field_config.required,
+            'readonly': field_config.readonly,
+        }
+        
+        # Add default value if specified
+        if field_config.default_value:
+            field_values['default'] = field_config.default_value
+        
+        if ttype == 'selection' and field_config.selection is not None:
+            selection_str = str(field_config.selection)
+            field_values['selection'] = selection_str
+        
+        return field_values
+    
+    def _get_model_id(self, model: str):
+        """Resolve the ir.model ID of a model, or None if it does not exist."""
+        if model in self._model_id_cache:
+            return self._model_id_cache[model]
+        
+        model_data = self._execute(
+            'ir.model', 'search_read',
+            [['model', '=', model]],
+            fields=['id'], limit=1
+        )
+        if not model_data:
+            return None
+        
+        self._model_id_cache[model] = model_data[0]['id']
+        return self._model_id_cache[model]
+    
+    def create_field(self, model: str, field_config: FieldSpec) -> bool:
+        """Create a custom field on the worksheet template model."""
+        field_name = field_config.name
+        
+        if self.check_field_exists(model, field_name):
+            logger.info(f"  ⊙ Field '{field_name}' already exists, skipping...")
+            return True
+        
+        try:
+            model_id = self._get_model_id(model)
+            if not model_id:
+                logger.error(f"  ❌ Model '{model}' not found")
+                return False
+            
+            field_values = self._build_field_values(model_id, field_config)
+            field_id = self._execute('ir.model.fields', 'create', field_values)
+            self._remember_field(model, field_name)
+            logger.info(f"  ✅ Created field '{field_name}' (ID: {field_id})")
+            return True
+            
+        except _DESIGN_ERRORS as e:
+            logger.error(f"  ❌ Error creating field '{field_name}': {e}")
+            return False
+    
+    def create_fields_bulk(self, model: str, field_configs: List[FieldSpec]) -> List[str]:
+        """
+        Create all missing fields on the model with a single create call.
+        Returns the names of the fields that could not be created.
+        """
+        existing = self._cached_fields(model)
+        if existing is None:
+            try:
+                existing = self.prefetch_existing_fields(model)
+            except _RPC_ERRORS as e:
+                logger.error(f"  ❌ Error reading existing fields of '{model}': {e}")
+                return [f.name for f in field_configs]
+        
+        to_create = [f for f in field_configs if f.name not in existing]
+        
+        if not to_create:
+            return []
         
-        return xml
+        try:
+            model_id = self._get_model_id(model)
+        except _DESIGN_ERRORS as e:
+            logger.error(f"  ❌ Error resolving model '{model}': {e}")
+            return [f.name for f in to_create]
+        
+        if not model_id:
+            logger.error(f"  ❌ Model '{model}' not found")
+            return [f.name for f in to_create]
+        
+        try:
+            field_ids = self._execute(
+                'ir.model.fields', 'create',
+                [self._build_field_values(model_id, f) for f in to_create]
+            )
+        except _DESIGN_ERRORS as e:
+            # One bad field fails the whole batch; retry one by one so the
+            # rest still get created and the culprit is reported by name
+            logger.warning(f"  ⚠️ Bulk create failed ({e}), creating fields one by one...")
+            return [f.name for f in to_create if not self.create_field(model, f)]
+        
+        lines = []
+        for field_config, field_id in zip(to_create, field_ids):
+            self._remember_field(model, field_config.name)
+            lines.append(f"  ✅ Created field '{field_config.name}' (ID: {field_id})")
+        # One log record (and one write) for the whole batch
+        logger.info('\n'.join(lines))
+        return []
+    
+    def generate_worksheet_xml_hermiticity(self, template_config: TemplateSpec) -> str:
+        """Generate XML for Hermiticity test worksheet."""
+        return _xml_attr(template_config.template_name).join(_HERMITICITY_ARCH_PARTS)
     
-    def generate_worksheet_xml(self, template_config: Dict[str, Any]) -> str:
+    def generate_worksheet_xml_temperatura(self, template_config: TemplateSpec) -> str:
+        """Generate XML for Temperature test worksheet."""
+        return _xml_attr(template_config.template_name).join(_TEMPERATURA_ARCH_PARTS)
+    
+    # Template code keyword -> arch generator; hermiticity is the fallback
+    _XML_GENERATORS = {
+        'temperatura': generate_worksheet_xml_temperatura,
+        'hermiticity': generate_worksheet_xml_hermiticity,
+    }
+    
+    def generate_worksheet_xml(self, template_config: TemplateSpec) -> str:
         """Generate appropriate XML based on template type."""
-        template_code = template_config.get('template_code', '')
+        template_code = template_config.template_code.casefold()
         
-        if 'temperatura' in template_code.lower():
-            return self.generate_worksheet_xml_temperatura(template_config)
-        else:
-            return self.generate_worksheet_xml_hermiticity(template_config)
+        generator = self._XML_GENERATORS.get(template_code)
+        if generator is None:
+            generator = next(
+                (fn for key, fn in self._XML_GENERATORS.items() if key in template_code),
+                WorksheetTemplateDesigner.generate_worksheet_xml_hermiticity
+            )
+        return generator(self, template_config)
+    
+    def _register_view_xmlid(self, view_name: str, view_id: int):
+        """Give the view a stable external ID so later runs find it by xmlid."""
+        try:
+            self._execute('ir.model.data', 'create', {
+                'module': self.VIEW_XMLID_MODULE,
+                'name': view_name,
+                'model': 'ir.ui.view',
+                'res_id': view_id,
+                'noupdate': True,
+            })
+        except _RPC_ERRORS as e:
+            # Not fatal: the view is still found by name on the next run
+            logger.warning(f"  ⚠️ Could not register external ID for view {view_id}: {e}")
     
-    def create_worksheet_view(self, worksheet_model: str, template_config: Dict[str, Any]) -> int:
+    def find_worksheet_view(self, worksheet_model: str):
+        """Return the ID of the worksheet form view, or None if not created yet."""
+        view_name = f"view_{worksheet_model.replace('.', '_')}_form"
+        xmlids = self._execute(
+            'ir.model.data', 'search_read',
+            [['module', '=', self.VIEW_XMLID_MODULE], ['name', '=', view_name],
+             ['model', '=', 'ir.ui.view']],
+            fields=['res_id'], limit=1
+        )
+        if xmlids:
+            self._existing_views[worksheet_model] = xmlids[0]['res_id']
+            return self._existing_views[worksheet_model]
+        
+        # Views created before external IDs were assigned are matched by name
+        existing_views = self._execute(
+            'ir.ui.view', 'search',
+            [['name', '=', view_name], ['model', '=', worksheet_model]],
+            limit=1
+        )
+        view_id = existing_views[0] if existing_views else None
+        if view_id:
+            self._register_view_xmlid(view_name, view_id)
+        self._existing_views[worksheet_model] = view_id
+        return view_id
+    
+    def prefetch_model_state(self, worksheet_model: str, field_names: List[str]):
+        """
+        Look up existing fields and the existing view up front.
+        Both run on the main keep-alive connection: worker threads would each
+        open a new connection, costing more handshakes than the round trip saved.
+        """
+        lookups = {'view': self.find_worksheet_view}
+        if self._cached_fields(worksheet_model) is None:
+            lookups['fields'] = self.prefetch_existing_fields
+        
+        # Neither is fatal: the later steps query again on a cache miss
+        for name, lookup in lookups.items():
+            try:
+                lookup(worksheet_model)
+            except _DESIGN_ERRORS as e:
+                logger.warning(f"  ⚠️ Could not prefetch existing {name}: {e}")
+        
+        existing = self._cached_fields(worksheet_model)
+        if existing is not None:
+            logger.info(f"  ⊙ {len(existing.intersection(field_names))} of {len(field_names)} fields already exist")
+    
+    def create_worksheet_view(self, worksheet_model: str, template_config: TemplateSpec) -> int:
         """Create the form view for the worksheet template."""
         try:
             view_name = f"view_{worksheet_model.replace('.', '_')}_form"
             view_xml = self.generate_worksheet_xml(template_config)
             
             # Check if view exists
-            existing_views = self._execute(
-                'ir.ui.view', 'search',
-                [['name', '=', view_name], ['model', '=', worksheet_model]]
-            )
+            if worksheet_model in self._existing_views:
+                view_id = self._existing_views[worksheet_model]
+            else:
+                view_id = self.find_worksheet_view(worksheet_model)
             
-            if existing_views:
-                print(f"  ⊙ View '{view_name}' already exists, updating...")
-                view_id = existing_views[0]
+            if view_id:
+                logger.info(f"  ⊙ View '{view_name}' already exists, updating...")
                 self._execute('ir.ui.view', 'write', [view_id], {
                     'arch': view_xml,
                 })
-                print(f"  ✅ Updated view (ID: {view_id})")
+                logger.info(f"  ✅ Updated view (ID: {view_id})")
                 return view_id
             
             # Create new view
@@ -340,13 +611,14 @@ class WorksheetTemplateDesigner:
             }
             
             view_id = self._execute('ir.ui.view', 'create', view_values)
-            print(f"  ✅ Created worksheet view '{view_name}' (ID: {view_id})")
+            self._register_view_xmlid(view_name, view_id)
+            self._existing_views[worksheet_model] = view_id
+            logger.info(f"  ✅ Created worksheet view '{view_name}' (ID: {view_id})")
             return view_id
             
-        except Exception as e:
-            print(f"  ❌ Error creating view: {e}")
-            import traceback
-            traceback.print_exc()
+        except _DESIGN_ERRORS as e:
+            logger.error(f"  ❌ Error creating view: {e}")
+            logger.debug("Error creating view", exc_info=True)
             return None
     
     def design_template(self, json_path: str) -> Dict[str, Any]:
@@ -355,29 +627,112 @@ class WorksheetTemplateDesigner:
         Adds fields and creates the form view.
         """
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                template = json.load(f)
-        except Exception as e:
-            print(f"❌ Error loading JSON: {e}")
+            template = load_json(json_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Error loading JSON: {e}")
             return {'success': False, 'error': str(e)}
         
-        template_name = template['template_name']
-        fields = template['fields']
+        return self.design_template_from_dict(template)
+    
+    def design_template_from_dict(self, template: Dict[str, Any]) -> Dict[str, Any]:
+        """Design a worksheet template from an already loaded template config."""
+        try:
+            spec = parse_template(template)
+        except ValueError as e:
+            logger.error(f"❌ {e}")
+            return {'success': False, 'error': str(e)}
         
-        print(f"{'='*70}")
-        print(f"🎨 WORKSHEET TEMPLATE DESIGNER")
-        print(f"{'='*70}")
-        print(f"Template: {template_name}")
-        print(f"Fields to add: {len(fields)}")
-        print(f"{'='*70}\n")
+        template_name = spec.template_name
+        fields = spec.fields
+        
+        logger.info(f"{'='*70}")
+        logger.info(f"🎨 WORKSHEET TEMPLATE DESIGNER")
+        logger.info(f"{'='*70}")
+        logger.info(f"Template: {template_name}")
+        logger.info(f"Fields to add: {len(fields)}")
+        logger.info(f"{'='*70}\n")
+        
+        server_result = self.design_on_server(spec)
+        if server_result:
+            logger.info("⚡ Fields and view applied in one call by the worksheet_designer_rpc addon")
+            field_ids = server_result.get('field_ids') or {}
+            worksheet_model = server_result['worksheet_model']
+            if field_ids:
+                for name in field_ids:
+                    self._remember_field(worksheet_model, name)
+                logger.info('\n'.join(
+                    f"  ✅ Created field '{name}' (ID: {field_id})"
+                    for name, field_id in field_ids.items()
+                ))
+            self._template_cache[template_name] = (server_result['template_id'], worksheet_model)
+            results = {
+                'template_name': template_name,
+                'template_id': server_result['template_id'],
+                'worksheet_model': worksheet_model,
+                'total_fields': len(fields),
+                'created': len(fields),
+                'failed': 0,
+                'failed_fields': [],
+                'field_ids': field_ids,
+                'view_id': server_result['view_id'],
+            }
+        else:
+            results = self._design_step_by_step(spec)
+            if not results.get('template_id'):
+                return results
+        
+        # Summary
+        logger.info(f"\n{'='*70}")
+        logger.info(f"✅ WORKSHEET DESIGN COMPLETE!")
+        logger.info(f"{'='*70}")
+        logger.info(f"Template: {template_name} (ID: {results['template_id']})")
+        logger.info(f"Model: {results['worksheet_model']}")
+        logger.info(f"Fields created: {results['created']}/{results['total_fields']}")
+        logger.info(f"Form view: {'✅' if results['view_id'] else '❌'} (ID: {results['view_id']})")
+        if results['failed_fields']:
+            logger.info(f"Failed fields: {', '.join(results['failed_fields'])}")
+        logger.info(f"{'='*70}\n")
+        
+        results['success'] = results['view_id'] is not None
+        return results
+    
+    def design_on_server(self, spec: TemplateSpec):
+        """
+        Apply fields and view with one call to the worksheet_designer_rpc addon.
+        Only used when enabled (use_server_design in config.json).
+        Returns None when disabled, the addon is not installed or the call failed.
+        """
+        if not self._server_design:
+            return None
+        
+        payload = {
+            'template_name': spec.template_name,
+            # model_id is filled in on the server
+            'fields': [self._build_field_values(None, f) for f in spec.fields],
+            'arch': self.generate_worksheet_xml(spec),
+        }
+        try:
+            return self._execute('worksheet.template', self.SERVER_DESIGN_METHOD, payload)
+        except _RPC_ERRORS as e:
+            if self.SERVER_DESIGN_METHOD in str(e):
+                # Addon not installed: use the step-by-step path from now on
+                self._server_design = False
+            else:
+                logger.warning(f"  ⚠️ Server-side design failed ({e}), going step by step...")
+            return None
+    
+    def _design_step_by_step(self, spec: TemplateSpec) -> Dict[str, Any]:
+        """Find the template, add the fields and write the view with separate calls."""
+        template_name = spec.template_name
+        fields = spec.fields
         
         # Step 1: Find the worksheet template and its model
-        print("🔍 STEP 1: Finding worksheet template...")
+        logger.info("🔍 STEP 1: Finding worksheet template...")
         template_id, worksheet_model = self.find_worksheet_template_by_name(template_name)
         
         if not template_id or not worksheet_model:
-            print("\n❌ Could not find the worksheet template!")
-            print("💡 Make sure you created it in Field Service → Configuration → Worksheet Templates")
+            logger.error("\n❌ Could not find the worksheet template!")
+            logger.info("💡 Make sure you created it in Field Service → Configuration → Worksheet Templates")
             return {'success': False}
         
         results = {
@@ -391,40 +746,23 @@ class WorksheetTemplateDesigner:
         }
         
         # Step 2: Add custom fields to the worksheet model
-        print(f"\n📝 STEP 2: Adding custom fields to '{worksheet_model}'...")
-        for idx, field_config in enumerate(fields, 1):
-            print(f"[{idx}/{len(fields)}] {field_config['name']}")
-            success = self.create_field(worksheet_model, field_config)
-            
-            if success:
-                results['created'] += 1
-            else:
-                results['failed'] += 1
-                results['failed_fields'].append(field_config['name'])
-        
-        # Step 3: Create the worksheet form view
-        print(f"\n🎨 STEP 3: Creating worksheet form view...")
-        view_id = self.create_worksheet_view(worksheet_model, template)
-        results['view_id'] = view_id
+        logger.info(f"\n📝 STEP 2: Adding custom fields to '{worksheet_model}'...")
+        self.prefetch_model_state(worksheet_model, [f.name for f in fields])
         
-        # Summary
-        print(f"\n{'='*70}")
-        print(f"✅ WORKSHEET DESIGN COMPLETE!")
-        print(f"{'='*70}")
-        print(f"Template: {template_name} (ID: {template_id})")
-        print(f"Model: {worksheet_model}")
-        print(f"Fields created: {results['created']}/{results['total_fields']}")
-        print(f"Form view: {'✅' if view_id else '❌'} (ID: {view_id})")
-        if results['failed_fields']:
-            print(f"Failed fields: {', '.join(results['failed_fields'])}")
-        print(f"{'='*70}\n")
+        failed_fields = self.create_fields_bulk(worksheet_model, fields)
+        results['created'] = len(fields) - len(failed_fields)
+        results['failed'] = len(failed_fields)
+        results['failed_fields'] = failed_fields
         
-        results['success'] = view_id is not None
+        # Step 3: Create the worksheet form view
+        logger.info(f"\n🎨 STEP 3: Creating worksheet form view...")
+        results['view_id'] = self.create_worksheet_view(worksheet_model, spec)
         return results
 
 
 def main():
     """Main execution function."""
+    logging.basicConfig(format='%(message)s', level=logging.INFO, stream=sys.stdout)
     
     print("""
 ╔═══════════════════════════════════════════════════════════════╗
@@ -437,8 +775,7 @@ def main():
         print("❌ ERROR: config.json not found!")
         sys.exit(1)
     
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    config = load_json('config.json')
     
     ODOO_URL = config['odoo_url'].rstrip('/')
     ODOO_DB = config['odoo_db']
@@ -450,6 +787,12 @@ def main():
         print(f"❌ ERROR: Template file not found: {TEMPLATE_FILE}")
         sys.exit(1)
     
+    try:
+        template = load_json(TEMPLATE_FILE)
+    except Exception as e:
+        print(f"❌ Error loading JSON: {e}")
+        sys.exit(1)
+    
     print(f"✅ Configuration loaded")
     print(f"  URL: {ODOO_URL}")
     print(f"  Database: {ODOO_DB}")
@@ -457,9 +800,10 @@ def main():
     
     try:
         designer = WorksheetTemplateDesigner(
-            ODOO_URL, ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD
+            ODOO_URL, ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD,
+            server_design=config.get('use_server_design', False)
         )
-        results = designer.design_template(TEMPLATE_FILE)
+        results = designer.design_template_from_dict(template)
         
         if results.get('success'):
             print("🎉 SUCCESS! Worksheet template designed automatically!\n")
@@ -486,7 +830,6 @@ def main():
             
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
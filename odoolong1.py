@@ -1,167 +1,26 @@
+from __future__ import annotations
+
 import xmlrpc.client
-import json
 import sys
 import os
+import threading
+import traceback
+import functools
+import hashlib
+import json
+import xml.etree.ElementTree as ET
 from typing import Dict, List, Any
+from xml.sax.saxutils import escape
 
-class WorksheetTemplateDesigner:
-    """
-    Designs existing Worksheet Templates in Field Service
-    Adds custom fields to the worksheet template model and creates the form view
-    """
-    
-    def __init__(self, url: str, db: str, username: str, password: str):
-        self.url = url
-        self.db = db
-        self.username = username
-        self.password = password
-        self.uid = None
-        self.models = None
-        
-        print(f"🔌 Connecting to {url}...")
-        self._authenticate()
-    
-    def _authenticate(self):
-        """Authenticate with Odoo and get user ID."""
-        common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-        
-        try:
-            self.uid = common.authenticate(self.db, self.username, self.password, {})
-            if not self.uid:
-                raise Exception("Authentication failed. Check credentials.")
-            
-            self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
-            print(f"✅ Successfully authenticated as user ID: {self.uid}\n")
-            
-        except Exception as e:
-            print(f"❌ Authentication error: {e}")
-            sys.exit(1)
-    
-    def _execute(self, model: str, method: str, *args, **kwargs):
-        """Execute an Odoo method via XML-RPC."""
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model, method, args, kwargs
-        )
-    
-    def find_worksheet_template_by_name(self, template_name: str) -> tuple:
-        """Find the worksheet template and its corresponding model."""
-        try:
-            template_ids = self._execute(
-                'worksheet.template', 'search',
-                [['name', '=', template_name]]
-            )
-            
-            if not template_ids:
-                print(f"  ❌ Worksheet template '{template_name}' not found")
-                return None, None
-            
-            template_id = template_ids[0]
-            
-            template_data = self._execute(
-                'worksheet.template', 'read',
-                [template_id], ['name', 'model_id']
-            )
-            
-            if not template_data or not template_data[0].get('model_id'):
-                print(f"  ❌ Could not find model for template")
-                return None, None
-            
-            model_id = template_data[0]['model_id'][0]
-            
-            model_data = self._execute(
-                'ir.model', 'read',
-                [model_id], ['model', 'name']
-            )
-            
-            if not model_data:
-                print(f"  ❌ Could not read model data")
-                return None, None
-            
-            worksheet_model = model_data[0]['model']
-            
-            print(f"  ✅ Found template: '{template_name}'")
-            print(f"  ✅ Template ID: {template_id}")
-            print(f"  ✅ Worksheet Model: {worksheet_model}")
-            
-            return template_id, worksheet_model
-            
-        except Exception as e:
-            print(f"  ❌ Error finding template: {e}")
-            import traceback
-            traceback.print_exc()
-            return None, None
-    
-    def check_field_exists(self, model: str, field_name: str) -> bool:
-        """Check if a field already exists on a model."""
-        try:
-            field_ids = self._execute(
-                'ir.model.fields', 'search',
-                [['model', '=', model], ['name', '=', field_name]]
-            )
-            return len(field_ids) > 0
-        except:
-            return False
-    
-    def create_field(self, model: str, field_config: Dict[str, Any]) -> bool:
-        """Create a custom field on the worksheet template model."""
-        field_name = field_config['name']
-        
-        if self.check_field_exists(model, field_name):
-            print(f"  ⊙ Field '{field_name}' already exists, skipping...")
-            return True
-        
-        try:
-            model_ids = self._execute('ir.model', 'search', [['model', '=', model]])
-            if not model_ids:
-                print(f"  ❌ Model '{model}' not found")
-                return False
-            
-            model_id = model_ids[0]
-            
-            field_type_map = {
-                'char': 'char',
-                'text': 'text',
-                'integer': 'integer',
-                'float': 'float',
-                'date': 'date',
-                'datetime': 'datetime',
-                'boolean': 'boolean',
-                'selection': 'selection',
-            }
-            
-            ttype = field_type_map.get(field_config['field_type'], 'char')
-            
-            field_values = {
-                'name': field_name,
-                'field_description': field_config['label'],
-                'model_id': model_id,
-                'ttype': ttype,
-                'state': 'manual',
-                'required': field_config.get('required', False),
-                'readonly': field_config.get('readonly', False),
-            }
-            
-            if ttype == 'selection' and 'selection' in field_config:
-                selection_str = str(field_config['selection'])
-                field_values['selection'] = selection_str
-            
-            field_id = self._execute('ir.model.fields', 'create', field_values)
-            print(f"  ✅ Created field '{field_name}' (ID: {field_id})")
-            return True
-            
-        except Exception as e:
-            print(f"  ❌ Error creating field '{field_name}': {e}")
-            return False
-    
-    def generate_worksheet_xml(self, template_config: Dict[str, Any]) -> str:
-        """Generate XML for the centrifuge revision worksheet form view."""
-        template_name = template_config['template_name']
-        
-        xml = '''<form string="''' + template_name + '''">
+from odoo_client import (
+    JsonFileCache, KeepAliveTransport, load_cached_uid, load_json, save_cached_uid,
+)
+
+# Centrifuge form view arch; {template_name} is filled in by generate_worksheet_xml
+_WORKSHEET_XML_TEMPLATE = '''<form string="{template_name}">
     <sheet>
         <div class="oe_title">
-            <h1>''' + template_name + '''</h1>
+            <h1>{template_name}</h1>
             <h3>Electrical &amp; Mechanical Inspection</h3>
         </div>
         
@@ -441,27 +300,358 @@ class WorksheetTemplateDesigner:
         
     </sheet>
 </form>'''
+
+# Context of create calls: skips chatter tracking and creation log messages
+_CREATE_CONTEXT = {'tracking_disable': True, 'mail_create_nolog': True, 'mail_notrack': True}
+
+# Reads answered from the on-disk cache: these records do not change
+# while templates are being designed
+_CACHED_READ_MODELS = frozenset({'ir.model'})
+_CACHED_READ_METHODS = frozenset({'search', 'read', 'search_read'})
+_MISSING = object()
+
+# Field types created as is; any other type falls back to char
+_ALLOWED_FTYPES = frozenset({
+    'char', 'text', 'integer', 'float', 'date', 'datetime', 'boolean', 'selection',
+})
+
+
+def _xml_attr(value: str) -> str:
+    """Escape a value for use in XML text or a double-quoted attribute."""
+    return escape(value, {'"': '&quot;'})
+
+
+@functools.lru_cache(maxsize=8)
+def _canonical_arch(arch: str) -> str:
+    """
+    Parse the arch and return its canonical (C14N 2.0) form without indentation
+    A malformed arch raises ParseError here instead of failing on the server
+    """
+    return ET.canonicalize(arch, strip_text=True)
+
+
+class AuthenticationError(Exception):
+    """Raised when the designer cannot log in to Odoo."""
+
+
+class WorksheetTemplateDesigner:
+    """
+    Designs existing Worksheet Templates in Field Service
+    Adds custom fields to the worksheet template model and creates the form view
+    """
+    
+    READ_CACHE_FILE = '.odoo_centrifuge_cache.json'
+    # Module part of the external ID given to generated views
+    VIEW_XMLID_MODULE = '__custom__'
+    
+    def __init__(self, url: str, db: str, username: str, password: str,
+                 use_uid_cache: bool = True):
+        self.url = url
+        self.db = db
+        self.username = username
+        self.password = password
+        self.uid = None
+        self.models = None
+        # Field names declared on each model, as reported by fields_get
+        self._existing_fields: Dict[str, set] = {}
+        self._model_id_cache: Dict[str, int] = {}
+        # Form view ID per worksheet model (None when not created yet)
+        self._view_ids: Dict[str, Any] = {}
+        # Progress lines of the field and view steps, written out in one go
+        self._log_lines: List[str] = []
+        self._log_lock = threading.Lock()
+        self.read_cache = JsonFileCache(self.READ_CACHE_FILE)
         
-        return xml
+        print(f"🔌 Connecting to {url}...")
+        self._authenticate(use_uid_cache)
     
-    def create_worksheet_view(self, worksheet_model: str, template_config: Dict[str, Any]) -> int:
-        """Create the form view for the worksheet template."""
+    def _authenticate(self, use_uid_cache: bool = True):
+        """
+        Authenticate with Odoo and get user ID.
+        Raises AuthenticationError when the login fails.
+        """
+        # One keep-alive connection shared by the common and object endpoints
+        transport = KeepAliveTransport(use_https=self.url.startswith('https'))
+        common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common', transport=transport)
+        
+        credentials = (self.url, self.db, self.username, self.password)
+        
         try:
-            view_name = f"view_{worksheet_model.replace('.', '_')}_form"
-            view_xml = self.generate_worksheet_xml(template_config)
+            # Every execute_kw call checks the password again, so a uid cached
+            # for the same credentials is safe to reuse without logging in
+            self.uid = load_cached_uid(*credentials) if use_uid_cache else None
+            if not self.uid:
+                self.uid = common.authenticate(self.db, self.username, self.password, {})
+                if not self.uid:
+                    raise Exception("Authentication failed. Check credentials.")
+                save_cached_uid(*credentials, self.uid)
+            
+            self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object', transport=transport)
+            print(f"✅ Successfully authenticated as user ID: {self.uid}\n")
+            
+        except Exception as e:
+            print(f"❌ Authentication error: {e}")
+            raise AuthenticationError(str(e)) from e
+    
+    def _log(self, message: str):
+        """Queue a progress line; worker threads may call this concurrently."""
+        with self._log_lock:
+            self._log_lines.append(message)
+    
+    def _flush_log(self):
+        """Write the queued progress lines to stdout with a single write."""
+        with self._log_lock:
+            lines, self._log_lines = self._log_lines, []
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+    
+    def _execute(self, model: str, method: str, *args, **kwargs):
+        """Execute an Odoo method via XML-RPC."""
+        if method == 'create' and 'context' not in kwargs:
+            kwargs['context'] = _CREATE_CONTEXT
+        
+        cacheable = model in _CACHED_READ_MODELS and method in _CACHED_READ_METHODS
+        if cacheable:
+            call = json.dumps([self.url, self.db, model, method, args, kwargs], sort_keys=True)
+            key = hashlib.sha256(call.encode()).hexdigest()
+            result = self.read_cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+        
+        result = self.models.execute_kw(
+            self.db, self.uid, self.password,
+            model, method, args, kwargs
+        )
+        if cacheable:
+            self.read_cache.set(key, result)
+        return result
+    
+    def find_worksheet_template_by_name(self, template_name: str) -> tuple:
+        """
+        Find the worksheet template and its corresponding model.
+        Returns (template_id, worksheet_model, model_id).
+        """
+        try:
+            # Search the template and read its model in the same call
+            template_data = self._execute(
+                'worksheet.template', 'search_read',
+                [['name', '=', template_name]],
+                fields=['name', 'model_id'], limit=1
+            )
+            
+            if not template_data:
+                print(f"  ❌ Worksheet template '{template_name}' not found")
+                return None, None, None
+            
+            template_id = template_data[0]['id']
+            
+            if not template_data[0].get('model_id'):
+                print(f"  ❌ Could not find model for template")
+                return None, None, None
+            
+            model_id = template_data[0]['model_id'][0]
+            
+            model_data = self._execute(
+                'ir.model', 'read',
+                [model_id], ['model', 'name']
+            )
+            
+            if not model_data:
+                print(f"  ❌ Could not read model data")
+                return None, None, None
+            
+            worksheet_model = model_data[0]['model']
+            
+            print(f"  ✅ Found template: '{template_name}'")
+            print(f"  ✅ Template ID: {template_id}")
+            print(f"  ✅ Worksheet Model: {worksheet_model}")
             
+            return template_id, worksheet_model, model_id
+            
+        except Exception as e:
+            print(f"  ❌ Error finding template: {e}")
+            traceback.print_exc()
+            return None, None, None
+    
+    def build_field_values(self, model_id: int, field_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the ir.model.fields values for one field config (no RPC)."""
+        ttype = field_config['field_type']
+        if ttype not in _ALLOWED_FTYPES:
+            ttype = 'char'
+        
+        field_values = {
+            'name': field_config['name'],
+            'field_description': field_config['label'],
+            'model_id': model_id,
+            'ttype': ttype,
+            'state': 'manual',
+            'required': field_config.get('required', False),
+            'readonly': field_config.get('readonly', False),
+        }
+        
+        if ttype == 'selection' and 'selection' in field_config:
+            selection_str = str(field_config['selection'])
+            field_values['selection'] = selection_str
+        
+        return field_values
+    
+    def get_model_id(self, model: str):
+        """Resolve the ir.model ID of a model, or None if it does not exist."""
+        if model in self._model_id_cache:
+            return self._model_id_cache[model]
+        
+        model_data = self._execute(
+            'ir.model', 'search_read',
+            [['model', '=', model]],
+            fields=['id'], limit=1
+        )
+        if not model_data:
+            return None
+        return self._model_id_cache.setdefault(model, model_data[0]['id'])
+    
+    def get_existing_field_names(self, model: str) -> set:
+        """
+        Return the names of the fields declared on a model, fetched once.
+        fields_get is answered from the server's model registry, without
+        searching the ir_model_fields table.
+        """
+        if model not in self._existing_fields:
+            declared = self._execute(model, 'fields_get', attributes=[])
+            self._existing_fields[model] = set(declared)
+        return self._existing_fields[model]
+    
+    def create_field(self, model_id: int, field_config: Dict[str, Any]) -> bool:
+        """Create a single custom field on the worksheet template model."""
+        field_name = field_config['name']
+        try:
+            field_values = self.build_field_values(model_id, field_config)
+            field_id = self._execute('ir.model.fields', 'create', field_values)
+            self._log(f"  ✅ Created field '{field_name}' (ID: {field_id})")
+            return True
+            
+        except Exception as e:
+            self._log(f"  ❌ Error creating field '{field_name}': {e}")
+            return False
+    
+    def create_fields(self, model: str, fields: List[Dict[str, Any]], model_id: int = None) -> List[str]:
+        """
+        Create the fields missing on the model with a single create call.
+        model_id is looked up when the caller does not already have it.
+        Returns the names of the fields that could not be created.
+        """
+        existing = self.get_existing_field_names(model)
+        if not model_id:
+            model_id = self.get_model_id(model)
+        
+        for field_config in fields:
+            if field_config['name'] in existing:
+                self._log(f"  ⊙ Field '{field_config['name']}' already exists, skipping...")
+        
+        to_create = [f for f in fields if f['name'] not in existing]
+        if not to_create:
+            return []
+        
+        if not model_id:
+            self._log(f"  ❌ Model '{model}' not found")
+            return [f['name'] for f in to_create]
+        
+        try:
+            field_ids = self._execute(
+                'ir.model.fields', 'create',
+                [self.build_field_values(model_id, f) for f in to_create]
+            )
+        except Exception as e:
+            # One bad field rejects the whole batch; create the fields one
+            # by one so the others still get created. Sequentially: each create
+            # alters the same table and reloads the registry on the server
+            self._log(f"  ⚠️ Bulk create failed ({e}), creating fields one by one...")
+            created = [self.create_field(model_id, f) for f in to_create]
+            self._existing_fields[model].update(
+                f['name'] for f, ok in zip(to_create, created) if ok
+            )
+            return [f['name'] for f, ok in zip(to_create, created) if not ok]
+        
+        for field_config, field_id in zip(to_create, field_ids):
+            self._log(f"  ✅ Created field '{field_config['name']}' (ID: {field_id})")
+        self._existing_fields[model].update(f['name'] for f in to_create)
+        return []
+    
+    def generate_worksheet_xml(self, template_config: Dict[str, Any]) -> str:
+        """Generate XML for the centrifuge revision worksheet form view."""
+        template_name = template_config['template_name']
+        
+        return _WORKSHEET_XML_TEMPLATE.format(template_name=_xml_attr(template_name))
+    
+    def _register_view_xmlid(self, view_name: str, view_id: int):
+        """Give the view a stable external ID so later runs find it by xmlid."""
+        try:
+            self._execute('ir.model.data', 'create', {
+                'module': self.VIEW_XMLID_MODULE,
+                'name': view_name,
+                'model': 'ir.ui.view',
+                'res_id': view_id,
+                'noupdate': True,
+            })
+        except Exception as e:
+            # Not fatal: the view is still found by name on the next run
+            self._log(f"  ⚠️ Could not register external ID for view {view_id}: {e}")
+    
+    def find_worksheet_view(self, worksheet_model: str):
+        """Return the ID of the worksheet form view, or None if not created yet."""
+        if worksheet_model in self._view_ids:
+            return self._view_ids[worksheet_model]
+        
+        view_name = f"view_{worksheet_model.replace('.', '_')}_form"
+        xmlids = self._execute(
+            'ir.model.data', 'search_read',
+            [['module', '=', self.VIEW_XMLID_MODULE], ['name', '=', view_name],
+             ['model', '=', 'ir.ui.view']],
+            fields=['res_id'], limit=1
+        )
+        if xmlids:
+            view_id = xmlids[0]['res_id']
+        else:
+            # Views created before external IDs were assigned are matched by name
             existing_views = self._execute(
                 'ir.ui.view', 'search',
-                [['name', '=', view_name], ['model', '=', worksheet_model]]
+                [['name', '=', view_name], ['model', '=', worksheet_model]],
+                limit=1
             )
+            view_id = existing_views[0] if existing_views else None
+            if view_id:
+                self._register_view_xmlid(view_name, view_id)
+        
+        self._view_ids[worksheet_model] = view_id
+        return view_id
+    
+    def prefetch_model_state(self, worksheet_model: str):
+        """
+        Look up the existing fields and the existing view up front, so the
+        later steps find them cached. Both run on the main keep-alive
+        connection rather than on worker threads with fresh connections.
+        """
+        # Not fatal: each step looks its data up again on a cache miss
+        for lookup in (self.get_existing_field_names, self.find_worksheet_view):
+            try:
+                lookup(worksheet_model)
+            except Exception as e:
+                self._log(f"  ⚠️ Prefetch failed: {e}")
+    
+    def create_worksheet_view(self, worksheet_model: str, template_config: Dict[str, Any]) -> int:
+        """Create the form view for the worksheet template."""
+        try:
+            view_name = f"view_{worksheet_model.replace('.', '_')}_form"
+            view_xml = _canonical_arch(self.generate_worksheet_xml(template_config))
+            
+            view_id = self.find_worksheet_view(worksheet_model)
             
-            if existing_views:
-                print(f"  ⊙ View '{view_name}' already exists, updating...")
-                view_id = existing_views[0]
+            if view_id:
+                self._log(f"  ⊙ View '{view_name}' already exists, updating...")
                 self._execute('ir.ui.view', 'write', [view_id], {
                     'arch': view_xml,
                 })
-                print(f"  ✅ Updated view (ID: {view_id})")
+                self._log(f"  ✅ Updated view (ID: {view_id})")
                 return view_id
             
             view_values = {
@@ -473,20 +663,22 @@ class WorksheetTemplateDesigner:
             }
             
             view_id = self._execute('ir.ui.view', 'create', view_values)
-            print(f"  ✅ Created worksheet view '{view_name}' (ID: {view_id})")
+            self._log(f"  ✅ Created worksheet view '{view_name}' (ID: {view_id})")
+            self._view_ids[worksheet_model] = view_id
+            self._register_view_xmlid(view_name, view_id)
             return view_id
             
         except Exception as e:
-            print(f"  ❌ Error creating view: {e}")
-            import traceback
+            self._log(f"  ❌ Error creating view: {e}")
+            # Write the buffered lines first so the traceback follows its error line
+            self._flush_log()
             traceback.print_exc()
             return None
     
     def design_template(self, json_path: str) -> Dict[str, Any]:
         """Main function: Design an existing worksheet template."""
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                template = json.load(f)
+            template = load_json(json_path)
         except Exception as e:
             print(f"❌ Error loading JSON: {e}")
             return {'success': False, 'error': str(e)}
@@ -502,7 +694,7 @@ class WorksheetTemplateDesigner:
         print(f"{'='*70}\n")
         
         print("🔍 STEP 1: Finding worksheet template...")
-        template_id, worksheet_model = self.find_worksheet_template_by_name(template_name)
+        template_id, worksheet_model, model_id = self.find_worksheet_template_by_name(template_name)
         
         if not template_id or not worksheet_model:
             print("\n❌ Could not find the worksheet template!")
@@ -520,20 +712,28 @@ class WorksheetTemplateDesigner:
         }
         
         print(f"\n🔧 STEP 2: Adding custom fields to '{worksheet_model}'...")
-        for idx, field_config in enumerate(fields, 1):
-            print(f"[{idx}/{len(fields)}] {field_config['name']}")
-            success = self.create_field(worksheet_model, field_config)
-            
-            if success:
-                results['created'] += 1
-            else:
-                results['failed'] += 1
-                results['failed_fields'].append(field_config['name'])
+        self.prefetch_model_state(worksheet_model)
+        try:
+            failed_fields = self.create_fields(worksheet_model, fields, model_id)
+        except Exception as e:
+            self._log(f"  ❌ Error adding fields: {e}")
+            failed_fields = [f['name'] for f in fields]
+        self._flush_log()
+        
+        results['created'] = len(fields) - len(failed_fields)
+        results['failed'] = len(failed_fields)
+        results['failed_fields'] = failed_fields
         
         print(f"\n🎨 STEP 3: Creating worksheet form view...")
         view_id = self.create_worksheet_view(worksheet_model, template)
+        self._flush_log()
         results['view_id'] = view_id
         
+        try:
+            self.read_cache.save()
+        except OSError as e:
+            print(f"  ⚠️ Could not save read cache: {e}")
+        
         print(f"\n{'='*70}")
         print(f"✅ WORKSHEET DESIGN COMPLETE!")
         print(f"{'='*70}")
@@ -563,8 +763,7 @@ def main():
         print("❌ ERROR: config.json not found!")
         sys.exit(1)
     
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    config = load_json('config.json')
     
     ODOO_URL = config['odoo_url'].rstrip('/')
     ODOO_DB = config['odoo_db']
@@ -611,9 +810,10 @@ def main():
             print("   Create it in: Field Service → Configuration → Worksheet Templates")
             sys.exit(1)
             
+    except AuthenticationError:
+        sys.exit(1)
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
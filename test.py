@@ -1,11 +1,10 @@
-import xmlrpc.client
-import json
+from odoo_client import load_json
+from odoolong1 import WorksheetTemplateDesigner
 
 print("Loading configuration...")
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_json('config.json')
 
-url = config['odoo_url']
+url = config['odoo_url'].rstrip('/')
 db = config['odoo_db']
 username = config['odoo_username']
 password = config['odoo_password']
@@ -15,14 +14,16 @@ print(f"Database: {db}")
 print(f"Username: {username}")
 
 try:
-    common = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/common')
-    uid = common.authenticate(db, username, password, {})
+    # Same connection path as the designer; the uid cache is skipped since
+    # checking the credentials is the point
+    designer = WorksheetTemplateDesigner(url, db, username, password, use_uid_cache=False)
+    user = designer._execute('res.users', 'read', [designer.uid], ['login'])
     
-    if uid:
-        print(f"\n✓ SUCCESS! Connected as user ID: {uid}")
+    if user:
+        print(f"\n✓ SUCCESS! Connected as user ID: {designer.uid} ({user[0]['login']})")
         print("Your configuration is correct!")
     else:
-        print("\n✗ FAILED! Authentication returned False")
+        print("\n✗ FAILED! Could not read the authenticated user")
         print("Check your credentials in config.json")
         
 except Exception as e:
@@ -31,4 +32,4 @@ except Exception as e:
     print("  - Wrong URL (check spelling and https://)")
     print("  - Wrong database name")
     print("  - Wrong username or API key")
-    print("  - Network/firewall blocking connection")
\ No newline at end of file
+    print("  - Network/firewall blocking connection")
@@ -0,0 +1,15 @@
+{
+    'name': 'Worksheet Designer RPC',
+    'version': '1.0',
+    'summary': 'Design a worksheet template in one RPC call',
+    'description': """
+Adds worksheet.template.design_from_spec so the worksheet designer
+scripts can create the custom fields and the form view of a template
+in a single call and a single database transaction.
+Enable it in the scripts with "use_server_design": true in config.json.
+    """,
+    'depends': ['worksheet'],
+    'data': [],
+    'installable': True,
+    'license': 'LGPL-3',
+}
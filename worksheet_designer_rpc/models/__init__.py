@@ -0,0 +1 @@
+from . import worksheet_template
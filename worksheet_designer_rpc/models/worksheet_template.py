@@ -0,0 +1,65 @@
+from odoo import api, models
+from odoo.exceptions import UserError
+
+# Module part of the external ID given to generated views
+VIEW_XMLID_MODULE = '__custom__'
+
+
+class WorksheetTemplate(models.Model):
+    _inherit = 'worksheet.template'
+
+    @api.model
+    def design_from_spec(self, spec):
+        """
+        Create the missing custom fields and upsert the form view of a template
+        spec: {'template_name': str, 'fields': [ir.model.fields values
+        without model_id], 'arch': str}
+        Each step feeds the next (template -> model -> fields -> view), all in
+        the request's transaction, so it either fully applies or not at all
+        Returns {template_id, worksheet_model, field_ids: {name: id}, view_id}
+        """
+        template = self.search([('name', '=', spec['template_name'])], limit=1)
+        if not template or not template.model_id:
+            raise UserError(f"Worksheet template '{spec['template_name']}' not found")
+        model = template.model_id
+
+        existing = set(model.field_id.mapped('name'))
+        to_create = [
+            dict(vals, model_id=model.id)
+            for vals in spec['fields'] if vals['name'] not in existing
+        ]
+        created = self.env['ir.model.fields'].create(to_create)
+
+        view_name = f"view_{model.model.replace('.', '_')}_form"
+        view = self.env.ref(f'{VIEW_XMLID_MODULE}.{view_name}', raise_if_not_found=False)
+        if view:
+            view.arch = spec['arch']
+        else:
+            # Views created before external IDs were assigned are matched by name
+            view = self.env['ir.ui.view'].search(
+                [('name', '=', view_name), ('model', '=', model.model)], limit=1
+            )
+            if view:
+                view.arch = spec['arch']
+            else:
+                view = self.env['ir.ui.view'].create({
+                    'name': view_name,
+                    'model': model.model,
+                    'type': 'form',
+                    'arch': spec['arch'],
+                    'priority': 1,
+                })
+            self.env['ir.model.data'].create({
+                'module': VIEW_XMLID_MODULE,
+                'name': view_name,
+                'model': 'ir.ui.view',
+                'res_id': view.id,
+                'noupdate': True,
+            })
+
+        return {
+            'template_id': template.id,
+            'worksheet_model': model.model,
+            'field_ids': {field.name: field.id for field in created},
+            'view_id': view.id,
+        }